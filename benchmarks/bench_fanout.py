@@ -0,0 +1,151 @@
+"""Micro-benchmark for MQTT message fan-out to entities.
+
+Builds the state store of a synthetic account, connects one dispatcher
+listener per entity the way the light and climate platforms do, and feeds
+routed messages straight into _async_drain_inbox. No broker is needed.
+
+    python benchmarks/bench_fanout.py
+    python benchmarks/bench_fanout.py --sizes 10 10000 --messages 5000
+
+Measured per synthetic account size; each value should stay flat as the
+device count grows:
+    signals_per_msg   dispatcher signals sent per message
+    wakeups_per_msg   entity callbacks run per message
+    drain_us_per_msg  time in _async_drain_inbox per message
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from pytest_homeassistant_custom_component.common import async_test_home_assistant
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from bench_inshow import synthetic_zones  # noqa: E402
+from custom_components.inshow.api import (  # noqa: E402
+    ROUTE_CLIMATE,
+    ROUTE_LIGHT,
+    InshowApi,
+)
+from custom_components.inshow.const import (  # noqa: E402
+    SIGNAL_CLIMATE_UPDATE,
+    SIGNAL_LIGHT_UPDATE,
+    SIGNAL_ZONE_UPDATE,
+)
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_MESSAGES = 2000
+# 10개 메시지 중 1개는 온도조절기
+CLIMATE_EVERY = 10
+
+
+def _messages(api, count):
+    """Return routed (kind, target, data) records alternating every light's state."""
+    lights = list(api.store.lights.values())
+    climates = list(api.store.climates.values())
+    records = []
+    for i in range(count):
+        if climates and i % CLIMATE_EVERY == CLIMATE_EVERY - 1:
+            record = climates[i % len(climates)]
+            data = {"Temperature": 20 + i % 5, "POWER_RL": "ON"}
+            records.append((ROUTE_CLIMATE, record.controller_id, data))
+            continue
+        record = lights[i % len(lights)]
+        data = {
+            "serial": record.controller_id,
+            "data": {"port": record.port, "onoff": (i // len(lights) + 1) % 2},
+        }
+        records.append((ROUTE_LIGHT, record.controller_id, data))
+    return records
+
+
+async def run_size(devices, messages):
+    counts = {"signals": 0, "wakeups": 0}
+
+    @callback
+    def _wakeup():
+        counts["wakeups"] += 1
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        async with async_test_home_assistant(config_dir=config_dir) as hass:
+            api = InshowApi(hass, "bench@example.com", "bench", {}, "bench")
+            datas = synthetic_zones(devices)
+            await api.names.async_romanize_all(
+                [data.get("name") for data in datas]
+                + [x["name"] for data in datas for x in data["groups"]]
+            )
+            api._async_apply_topology(*api._parse_zones(datas))
+            api.entities_loaded = True
+
+            # 엔티티 하나당 listener 하나, 플랫폼과 같은 signal 이름으로 연결
+            unsubs = [
+                async_dispatcher_connect(
+                    hass, SIGNAL_LIGHT_UPDATE.format(r.controller_id, r.port), _wakeup
+                )
+                for r in api.store.lights.values()
+            ]
+            unsubs += [
+                async_dispatcher_connect(
+                    hass, SIGNAL_CLIMATE_UPDATE.format(r.controller_id), _wakeup
+                )
+                for r in api.store.climates.values()
+            ]
+            unsubs += [
+                async_dispatcher_connect(
+                    hass, SIGNAL_ZONE_UPDATE.format(zone_id), _wakeup
+                )
+                for zone_id in api.request_zone_ids()
+            ]
+            send_signals = api._async_send_signals
+
+            @callback
+            def _count_signals(signals):
+                counts["signals"] += len(signals)
+                send_signals(signals)
+
+            api._async_send_signals = _count_signals
+
+            records = _messages(api, messages)
+            elapsed = 0.0
+            for record in records:
+                api._inbox.append(record)
+                start = time.perf_counter()
+                api._drain_requested_at = start
+                api._async_drain_inbox()
+                elapsed += time.perf_counter() - start
+            await hass.async_block_till_done()
+
+            for unsub in unsubs:
+                unsub()
+            await api.async_shutdown()
+    return {
+        "signals_per_msg": counts["signals"] / messages,
+        "wakeups_per_msg": counts["wakeups"] / messages,
+        "drain_us_per_msg": elapsed / messages * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inshow fan-out micro-benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES)
+    args = parser.parse_args()
+
+    for devices in args.sizes:
+        metrics = asyncio.run(run_size(devices, args.messages))
+        print(
+            f"{devices:>6}: "
+            + ", ".join(f"{name}={value:.2f}" for name, value in metrics.items())
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,579 @@
+"""End-to-end benchmarks for the Inshow integration.
+
+Runs the integration inside a minimal Home Assistant test instance against a
+local aiohttp stand-in for /authorize/signIn and /zones and a local
+MQTT-over-websocket broker, so no cloud access is needed.
+
+Every Inshow topic starts with $MTZ/, and amqtt refuses PUBLISH to topics
+starting with $ (MQTT-4.7.2-1). The size runs therefore need --broker
+pointing at a broker that accepts them. The built-in amqtt broker is only used
+by --replay, which feeds messages in-process.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_inshow.py --broker localhost:9001   # compare to baseline
+    python benchmarks/bench_inshow.py --broker localhost:9001 --update-baseline
+    python benchmarks/bench_inshow.py --sizes 10 1000 --broker localhost:9001
+    python benchmarks/bench_inshow.py --broker localhost:9001 --transport event_loop
+    python benchmarks/bench_inshow.py --replay inshow_traffic_<entry>.bin
+
+Measured per MQTT transport and synthetic account size:
+    setup_s          async_setup_entry until every entity is written
+    inbound_msg_s    state/changed messages per second from the broker into state
+    inbound_cpu_us   CPU time of this process per inbound message (the publisher
+                     and the broker run in other processes)
+    publish_ms_p50   async_turn_on until the control message reaches the broker
+    publish_ms_p95
+    memory_kib       allocated memory per entity after setup
+
+With --replay the inbound messages of a traffic recording are fed through the
+connection's routing and dispatch path instead (the account is built from the
+devices the recording talks about); --speed keeps the recorded pacing:
+    replay_msg_s            recorded messages per second into state
+    replay_cpu_us           CPU time per recorded message
+    replay_max_dispatch_ms  longest wait from queueing a message to notifying
+                            its entities
+    replay_unrouted         messages no device of the account matched
+"""
+
+import argparse
+import asyncio
+import base64
+from contextlib import asynccontextmanager
+import json
+import multiprocessing
+import os
+from pathlib import Path
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from aiohttp import web
+import paho.mqtt.client as mqtt
+from homeassistant import loader
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from custom_components.inshow import api as inshow_api  # noqa: E402
+from custom_components.inshow.const import (  # noqa: E402
+    CONF_COMMAND_WINDOW,
+    CONF_CONFIRM_TIMEOUT,
+    CONF_RECONCILE_INTERVAL,
+    CONF_TRANSPORT,
+    DOMAIN,
+    TRANSPORT_EVENT_LOOP,
+    TRANSPORT_THREAD,
+)
+from custom_components.inshow.traffic import DIRECTION_IN, read_recording  # noqa: E402
+from replay_traffic import async_replay  # noqa: E402
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+# 낮을수록 좋은 지표 / 높을수록 좋은 지표
+LOWER_IS_BETTER = (
+    "setup_s",
+    "inbound_cpu_us",
+    "publish_ms_p50",
+    "publish_ms_p95",
+    "memory_kib",
+    "replay_cpu_us",
+    "replay_max_dispatch_ms",
+)
+TRANSPORTS = (TRANSPORT_THREAD, TRANSPORT_EVENT_LOOP)
+HIGHER_IS_BETTER = ("inbound_msg_s", "replay_msg_s")
+
+PORTS_PER_CONTROLLER = 4
+DEVICES_PER_ZONE = 50
+# 10개 중 1개는 온도조절기
+CLIMATE_EVERY = 10
+INBOUND_MESSAGES = 5000
+INBOUND_TIMEOUT = 60
+PUBLISH_SAMPLES = 20
+
+
+class BenchmarkError(Exception):
+    """A measurement could not complete."""
+
+
+def _fake_token():
+    payload = base64.urlsafe_b64encode(
+        json.dumps({"exp": time.time() + 86400}).encode()
+    ).decode()
+    return f"e30.{payload.rstrip('=')}.sig"
+
+
+def _light_device(index, name, controller_id, port):
+    return {
+        "_id": f"dev{index}",
+        "name": name,
+        "isVirtual": False,
+        "controllerId": controller_id,
+        "item": {"ports": [port], "onoff": 0, "bright": 50, "color": 10},
+    }
+
+
+def _climate_device(index, controller_id):
+    return {
+        "_id": f"dev{index}",
+        "name": controller_id,
+        "isVirtual": False,
+        "controllerId": controller_id,
+        "item": {"currentTemp": 21.5, "targetTemp": 22.0, "onoff": 1, "pattern": 1},
+    }
+
+
+def _zone(zone_index, zone_id, devices):
+    return {
+        "_id": zone_id,
+        "name": f"거실{zone_index}",
+        "groups": [{"name": f"그룹{zone_index}", "devices": devices}],
+    }
+
+
+def synthetic_zones(devices):
+    """Return a /zones resultData with the given number of devices."""
+    zones = []
+    controller = 0
+    climates = 0
+    for zone_index, start in enumerate(range(0, devices, DEVICES_PER_ZONE)):
+        count = min(DEVICES_PER_ZONE, devices - start)
+        group_devices = []
+        index = 0
+        while index < count:
+            # 조명 controller는 port 여러 개를 한 번에 채우므로 나머지가 아닌 누적 수로 판단
+            if (start + index + 1) // CLIMATE_EVERY > climates:
+                climates += 1
+                group_devices.append(
+                    _climate_device(start + index, f"75DFISCA{controller:06d}")
+                )
+                index += 1
+            else:
+                controller_id = f"MCS{controller:06d}"
+                for port in range(1, PORTS_PER_CONTROLLER + 1):
+                    if index >= count:
+                        break
+                    group_devices.append(
+                        _light_device(
+                            start + index, f"{controller}_{port}번", controller_id, port
+                        )
+                    )
+                    index += 1
+            controller += 1
+        zones.append(_zone(zone_index, f"zone{zone_index}", group_devices))
+    return zones
+
+
+def recording_zones(records):
+    """Return a /zones resultData with every device a recording talks about."""
+    ports = {}
+    climates = set()
+    zone_ids = set()
+    for _, direction, topic, payload in records:
+        if direction != DIRECTION_IN:
+            continue
+        parts = topic.split("/")
+        if topic.startswith("stat/inshow/"):
+            climates.add(parts[2])
+        elif topic.startswith("$MTZ/inshow/mcs/") and topic.endswith("/state/changed"):
+            try:
+                data = json.loads(payload).get("data", {})
+            except (ValueError, AttributeError):
+                continue
+            found = [data["port"]] if "port" in data else data.get("ports") or []
+            ports.setdefault(parts[3], set()).update(found)
+        elif topic.startswith("$MTZ/inshow/zone/"):
+            zone_ids.add(parts[3])
+
+    # 기록에 나온 zone마다 controller를 돌아가며 배치 (zone이 없으면 하나 만듦)
+    zones = [
+        _zone(zone_index, zone_id, [])
+        for zone_index, zone_id in enumerate(sorted(zone_ids) or ["zone0"])
+    ]
+    controllers = [
+        (controller_id, sorted(ports[controller_id])) for controller_id in sorted(ports)
+    ]
+    controllers += [(controller_id, None) for controller_id in sorted(climates)]
+    index = 0
+    for controller_index, (controller_id, controller_ports) in enumerate(controllers):
+        group_devices = zones[controller_index % len(zones)]["groups"][0]["devices"]
+        if controller_ports is None:
+            group_devices.append(_climate_device(index, controller_id))
+            index += 1
+            continue
+        for port in controller_ports:
+            group_devices.append(
+                _light_device(index, f"{controller_id}_{port}번", controller_id, port)
+            )
+            index += 1
+    return zones
+
+
+@asynccontextmanager
+async def zones_server(zones):
+    """Serve /authorize/signIn and /zones on a local port."""
+    body = {"resultData": zones}
+
+    async def sign_in(request):
+        return web.json_response({"resultData": {"accessToken": _fake_token()}})
+
+    async def get_zones(request):
+        return web.json_response(body)
+
+    app = web.Application()
+    app.router.add_post("/api/authorize/signIn", sign_in)
+    app.router.add_get("/api/zones", get_zones)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}/api"
+    finally:
+        await runner.cleanup()
+
+
+@asynccontextmanager
+async def local_broker(address):
+    """Use the broker at address, or start an amqtt websocket broker."""
+    if address:
+        host, port = address.rsplit(":", 1)
+        yield host, int(port)
+        return
+    from amqtt.broker import Broker
+
+    port = 19001
+    broker = Broker(
+        {
+            "listeners": {"default": {"type": "ws", "bind": f"127.0.0.1:{port}"}},
+            "sys_interval": 0,
+            "auth": {"allow-anonymous": True, "plugins": ["auth_anonymous"]},
+            "topic-check": {"enabled": False},
+        }
+    )
+    await broker.start()
+    try:
+        yield "127.0.0.1", port
+    finally:
+        await broker.shutdown()
+
+
+def _mqtt_client(host, port):
+    client = mqtt.Client(transport="websockets")
+    client.ws_set_options(path="/ws")
+    client.connect(host, port)
+    client.loop_start()
+    return client
+
+
+@asynccontextmanager
+async def inshow_instance(base_url, transport):
+    """Start a test Home Assistant with the integration linked in."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.makedirs(os.path.join(config_dir, "custom_components"))
+        os.symlink(
+            REPO_ROOT / "custom_components" / DOMAIN,
+            os.path.join(config_dir, "custom_components", DOMAIN),
+        )
+        async with async_test_home_assistant(config_dir=config_dir) as hass:
+            hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+            inshow_api.BASE_URL = base_url
+            entry = MockConfigEntry(
+                domain=DOMAIN,
+                data={"E-mail": "bench@example.com", "password": "bench"},
+                options={
+                    CONF_TRANSPORT: transport,
+                    CONF_COMMAND_WINDOW: 0,
+                    CONF_CONFIRM_TIMEOUT: 0,
+                    CONF_RECONCILE_INTERVAL: 0,
+                },
+            )
+            entry.add_to_hass(hass)
+            try:
+                yield hass, entry
+            finally:
+                await hass.config_entries.async_unload(entry.entry_id)
+                await hass.async_block_till_done()
+
+
+async def measure_setup(hass, entry):
+    start = time.perf_counter()
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return time.perf_counter() - start
+
+
+def _publish_burst(host, port, messages, ready, go):
+    """Publish messages from a separate process so its CPU is not counted."""
+    client = _mqtt_client(host, port)
+    # 프로세스 시작과 연결 시간은 측정에서 빼도록 신호를 기다렸다가 발행
+    ready.set()
+    go.wait()
+    info = None
+    for topic, payload in messages:
+        info = client.publish(topic, payload)
+    if info is not None:
+        info.wait_for_publish()
+    client.loop_stop()
+    client.disconnect()
+
+
+async def measure_inbound(hass, entry, host, port):
+    """Return (messages per second, CPU microseconds per message)."""
+    api = entry.runtime_data
+    lights = list(api.store.lights.values())
+    messages = []
+    for i in range(INBOUND_MESSAGES):
+        record = lights[i % len(lights)]
+        onoff = (i // len(lights) + 1) % 2
+        messages.append(
+            (
+                f"$MTZ/inshow/mcs/{record.controller_id}/state/changed",
+                json.dumps(
+                    {
+                        "serial": record.controller_id,
+                        "data": {"port": record.port, "onoff": onoff},
+                    }
+                ),
+            )
+        )
+    context = multiprocessing.get_context("spawn")
+    ready = context.Event()
+    go = context.Event()
+    publisher = context.Process(
+        target=_publish_burst, args=(host, port, messages, ready, go)
+    )
+    publisher.start()
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(None, ready.wait, INBOUND_TIMEOUT):
+        publisher.kill()
+        raise BenchmarkError("publisher process did not connect to the broker")
+    before = api.stats["drained_messages"]
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    go.set()
+
+    async def _wait_drained():
+        while api.stats["drained_messages"] - before < INBOUND_MESSAGES:
+            await asyncio.sleep(0.01)
+
+    try:
+        await asyncio.wait_for(_wait_drained(), INBOUND_TIMEOUT)
+    except TimeoutError:
+        received = api.stats["drained_messages"] - before
+        raise BenchmarkError(
+            f"only {received}/{INBOUND_MESSAGES} inbound messages arrived "
+            f"within {INBOUND_TIMEOUT}s"
+        ) from None
+    finally:
+        await loop.run_in_executor(None, publisher.join)
+    await hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    return INBOUND_MESSAGES / elapsed, cpu / INBOUND_MESSAGES * 1e6
+
+
+async def measure_publish(hass, host, port):
+    loop = asyncio.get_running_loop()
+    arrivals = asyncio.Queue()
+    subscriber = _mqtt_client(host, port)
+    subscribed = threading.Event()
+    subscriber.on_subscribe = lambda *args: subscribed.set()
+    subscriber.on_message = lambda client, userdata, msg: loop.call_soon_threadsafe(
+        arrivals.put_nowait, time.perf_counter()
+    )
+    subscriber.subscribe("$MTZ/inshow/mcs/+/state/control")
+    await loop.run_in_executor(None, subscribed.wait, 10)
+    entity_id = next(
+        state.entity_id
+        for state in hass.states.async_all("light")
+        if not state.entity_id.endswith("_zone")
+    )
+    samples = []
+    try:
+        for i in range(PUBLISH_SAMPLES):
+            service = "turn_on" if i % 2 == 0 else "turn_off"
+            start = time.perf_counter()
+            await hass.services.async_call(
+                "light", service, {"entity_id": entity_id}, blocking=True
+            )
+            arrived = await asyncio.wait_for(arrivals.get(), 10)
+            samples.append((arrived - start) * 1000)
+    finally:
+        subscriber.loop_stop()
+        subscriber.disconnect()
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+async def measure_replay(hass, entry, records, speed):
+    """Feed a recording's inbound messages through the connection's dispatch path."""
+    api = entry.runtime_data
+    connection = api.connection
+    unrouted = connection.unrouted_messages
+
+    def deliver(topic, payload):
+        connection._on_message(
+            None, None, SimpleNamespace(topic=topic, payload=payload)
+        )
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    count = await async_replay(records, deliver, speed)
+    await hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    if not count:
+        raise BenchmarkError("the recording has no inbound messages")
+    return {
+        "replay_msg_s": count / elapsed,
+        "replay_cpu_us": cpu / count * 1e6,
+        "replay_max_dispatch_ms": api.stats["max_dispatch_ms"],
+        "replay_unrouted": connection.unrouted_messages - unrouted,
+    }
+
+
+async def run_replay(records, speed, broker_address, transport):
+    async with zones_server(recording_zones(records)) as base_url, local_broker(
+        broker_address
+    ) as (host, port):
+        inshow_api.BROKER_HOST = host
+        inshow_api.BROKER_PORT = port
+        inshow_api.BROKER_TLS = False
+
+        async with inshow_instance(base_url, transport) as (hass, entry):
+            await measure_setup(hass, entry)
+            return await measure_replay(hass, entry, records, speed)
+
+
+async def run_size(devices, broker_address, transport):
+    if not broker_address:
+        raise BenchmarkError(
+            "--broker is required: amqtt rejects PUBLISH to $MTZ/... topics"
+        )
+    zones = synthetic_zones(devices)
+    result = {}
+    async with zones_server(zones) as base_url, local_broker(broker_address) as (
+        host,
+        port,
+    ):
+        inshow_api.BROKER_HOST = host
+        inshow_api.BROKER_PORT = port
+        inshow_api.BROKER_TLS = False
+
+        async with inshow_instance(base_url, transport) as (hass, entry):
+            result["setup_s"] = await measure_setup(hass, entry)
+            rate, cpu = await measure_inbound(hass, entry, host, port)
+            result["inbound_msg_s"] = rate
+            result["inbound_cpu_us"] = cpu
+            p50, p95 = await measure_publish(hass, host, port)
+            result["publish_ms_p50"] = p50
+            result["publish_ms_p95"] = p95
+
+        # tracemalloc은 느려서 시간 측정과 분리된 별도 인스턴스에서 측정
+        async with inshow_instance(base_url, transport) as (hass, entry):
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            await measure_setup(hass, entry)
+            after = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            entities = len(hass.states.async_entity_ids(("light", "climate")))
+            result["memory_kib"] = (after - before) / max(entities, 1) / 1024
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions beyond tolerance (fraction)."""
+    regressions = []
+    for size, metrics in results.items():
+        for metric, value in metrics.items():
+            if (base := baseline.get(size, {}).get(metric)) is None:
+                continue
+            if metric in LOWER_IS_BETTER and value > base * (1 + tolerance):
+                regressions.append((size, metric, base, value))
+            elif metric in HIGHER_IS_BETTER and value < base * (1 - tolerance):
+                regressions.append((size, metric, base, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inshow end-to-end benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--broker", help="host:port of an MQTT websocket broker")
+    parser.add_argument(
+        "--transport", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS)
+    )
+    parser.add_argument("--replay", type=Path, help="traffic recording to replay")
+    parser.add_argument(
+        "--speed", type=float, default=0, help="replay speed; 0 is as fast as possible"
+    )
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    if args.replay:
+        records = list(read_recording(args.replay))
+        # replay baseline은 "transport/replay/파일 이름"으로 구분
+        runs = [
+            (
+                f"{transport}/replay/{args.replay.name}",
+                run_replay,
+                (records, args.speed, args.broker, transport),
+            )
+            for transport in args.transport
+        ]
+    else:
+        # baseline은 "transport/장치 수"로 구분
+        runs = [
+            (f"{transport}/{devices}", run_size, (devices, args.broker, transport))
+            for transport in args.transport
+            for devices in args.sizes
+        ]
+
+    results = {}
+    failed = False
+    for label, run, run_args in runs:
+        try:
+            metrics = asyncio.run(run(*run_args))
+        except BenchmarkError as e:
+            print(f"{label:>18}: FAILED: {e}")
+            failed = True
+            continue
+        results[label] = metrics
+        print(
+            f"{label:>18}: "
+            + ", ".join(f"{name}={value:.2f}" for name, value in metrics.items())
+        )
+    if failed:
+        return 1
+
+    if args.update_baseline:
+        baseline = (
+            json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        )
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print("No baseline yet; run with --update-baseline to store one")
+        return 0
+    regressions = compare(
+        results, json.loads(args.baseline.read_text()), args.tolerance
+    )
+    for size, metric, base, value in regressions:
+        print(f"REGRESSION {size} {metric}: {base:.2f} -> {value:.2f}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Micro-benchmark for romanized entity naming.
+
+Times turning a synthetic /zones payload into the state store, with the name
+service in each of its cache states. No broker or HTTP server is needed.
+
+    python benchmarks/bench_naming.py
+    python benchmarks/bench_naming.py --sizes 1000 10000 --repeat 5
+
+Measured per synthetic account size (best of --repeat runs):
+    uncached_s   a new Romanizer for every group and every device, as get_data
+                 did before the name service
+    cold_s       async_romanize_all + _parse_zones with an empty cache
+    restart_s    the same with the names persisted by a previous run
+    cached_s     the same with the names already in memory
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+from korean_romanizer.romanizer import Romanizer
+from pytest_homeassistant_custom_component.common import async_test_home_assistant
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from bench_inshow import synthetic_zones  # noqa: E402
+from custom_components.inshow.api import InshowApi, InshowNameService  # noqa: E402
+
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_REPEAT = 3
+
+
+def _texts(datas):
+    return [data.get("name") for data in datas] + [
+        x["name"] for data in datas for x in data["groups"]
+    ]
+
+
+def _romanize_uncached(datas):
+    """Name every device the way get_data did without the name service."""
+    names = []
+    for data in datas:
+        for x in data["groups"]:
+            prefix = Romanizer(x["name"]).romanize() + "_"
+            for y in x["devices"]:
+                Romanizer(data.get("name")).romanize()
+                names.append(prefix + y["name"].replace("번", ""))
+    return names
+
+
+async def _timed_parse(api, datas):
+    start = time.perf_counter()
+    await api.names.async_romanize_all(_texts(datas))
+    api._parse_zones(datas)
+    return time.perf_counter() - start
+
+
+async def run_size(devices, repeat):
+    datas = synthetic_zones(devices)
+    result = {"uncached_s": [], "cold_s": [], "restart_s": [], "cached_s": []}
+    with tempfile.TemporaryDirectory() as config_dir:
+        async with async_test_home_assistant(config_dir=config_dir) as hass:
+            api = InshowApi(hass, "bench@example.com", "bench", {}, "bench")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                _romanize_uncached(datas)
+                result["uncached_s"].append(time.perf_counter() - start)
+
+                # 저장된 이름이 없는 첫 설치
+                api.names = InshowNameService(hass)
+                await api.names._store.async_remove()
+                result["cold_s"].append(await _timed_parse(api, datas))
+                result["cached_s"].append(await _timed_parse(api, datas))
+
+                # 재시작: 메모리는 비었고 저장소에는 이름이 있음
+                api.names = InshowNameService(hass)
+                result["restart_s"].append(await _timed_parse(api, datas))
+            await api.async_shutdown()
+    return {metric: min(samples) for metric, samples in result.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inshow naming micro-benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    args = parser.parse_args()
+
+    for devices in args.sizes:
+        metrics = asyncio.run(run_size(devices, args.repeat))
+        print(
+            f"{devices:>6}: "
+            + ", ".join(f"{name}={value:.4f}" for name, value in metrics.items())
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
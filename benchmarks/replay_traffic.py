@@ -0,0 +1,89 @@
+"""Replay an Inshow traffic recording against a local stand-in broker.
+
+The integration writes recordings when the record_traffic option is on
+(inshow_traffic_<entry_id>.bin in the config directory). Point a test
+instance at a local broker and publish the recorded inbound messages to it:
+
+    python benchmarks/replay_traffic.py inshow_traffic.bin \\
+        --host localhost --port 1883 --speed 10
+
+The messages then go through the integration's normal routing and dispatch.
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+import sys
+import time
+
+import paho.mqtt.client as mqtt
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.inshow.traffic import DIRECTION_IN, read_recording  # noqa: E402
+
+# 최대 속도 replay에서 event loop에 양보하는 간격 (레코드 수)
+REPLAY_YIELD_EVERY = 500
+
+
+async def async_replay(records, deliver, speed=1.0, direction=DIRECTION_IN):
+    """Feed recorded messages to deliver(topic, payload), keeping their pacing.
+
+    speed scales the original gaps (10 is ten times faster); 0 replays as fast
+    as possible. Returns the number of messages delivered.
+    """
+    first = None
+    start = time.monotonic()
+    count = 0
+    for timestamp, record_direction, topic, payload in records:
+        if record_direction != direction:
+            continue
+        if first is None:
+            first = timestamp
+        if speed:
+            delay = (timestamp - first) / speed - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif count % REPLAY_YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+        deliver(topic, payload)
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an Inshow traffic recording")
+    parser.add_argument("recording")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--transport", choices=["tcp", "websockets"], default="tcp")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="1, 10, ... or 0 for as fast as possible"
+    )
+    args = parser.parse_args()
+
+    client = mqtt.Client(transport=args.transport)
+    client.connect(args.host, args.port)
+    client.loop_start()
+    infos = []
+
+    def deliver(topic, payload):
+        infos[:] = [client.publish(topic, payload)]
+
+    start = time.monotonic()
+    count = asyncio.run(
+        async_replay(read_recording(args.recording), deliver, args.speed)
+    )
+    if infos:
+        infos[0].wait_for_publish()
+    elapsed = time.monotonic() - start
+    client.loop_stop()
+    client.disconnect()
+    print(
+        f"Replayed {count} messages in {elapsed:.2f}s "
+        f"({count / max(elapsed, 1e-9):.0f} msg/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
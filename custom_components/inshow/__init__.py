@@ -6,11 +6,20 @@ import logging
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .api import InshowApi
+from .api import InshowApi, async_remove_topology
+from .const import (
+    CONF_KEEP_CONNECTION,
+    CONF_TRANSPORT,
+    DEFAULT_KEEP_CONNECTION,
+    DEFAULT_TRANSPORT,
+    SIGNAL_NEW_DEVICES,
+)
 
-PLATFORMS: list[Platform] = [Platform.LIGHT, Platform.CLIMATE]
+PLATFORMS: list[Platform] = [Platform.LIGHT, Platform.CLIMATE, Platform.SENSOR]
 
 type InshowConfigEntry = ConfigEntry[InshowApi]
 DOMAIN = "inshow"
@@ -19,20 +28,101 @@ _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass: HomeAssistant, entry: InshowConfigEntry) -> bool:
     """Set up config entry."""
-    api = InshowApi(hass, entry.data["E-mail"], entry.data["password"])
-    await api.initialize()
-
-    if await api.get_data():
+    warm = hass.data.get(DOMAIN, {}).get("warm", {})
+    if (api := warm.pop(entry.entry_id, None)) is not None:
+        # 옵션만 바뀐 reload: 기존 연결과 topology를 그대로 사용
+        api.apply_options(entry.options)
+        api.keep_warm = False
+        entry.runtime_data = api
+    elif await (
+        api := InshowApi(
+            hass,
+            entry.data["E-mail"],
+            entry.data["password"],
+            entry.options,
+            entry.entry_id,
+        )
+    ).async_load_cached_topology():
+        # 저장된 topology로 엔티티를 바로 만들고 로그인/연결/갱신은 백그라운드에서 진행
+        entry.runtime_data = api
+        entry.async_create_background_task(
+            hass, api.async_start(), "inshow_topology_refresh"
+        )
+    elif await api.async_start():
         entry.runtime_data = api
     else:
         _LOGGER.error("Failed to retrieve data from API")
+        await api.async_shutdown()
         return False
 
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    # 장치가 없는 플랫폼은 건너뜀
+    api.platforms = _platforms_for(api)
+    # 각 플랫폼은 setup 시점의 store로 엔티티를 만들고, 그 뒤의 변경은 signal로 받음
+    api.entities_loaded = True
+    await hass.config_entries.async_forward_entry_setups(entry, api.platforms)
+
+    # 예전에 모든 엔티티를 담던 단일 장치는 controller별 장치로 옮겨간 뒤 제거
+    device_registry = dr.async_get(hass)
+    if device := device_registry.async_get_device(identifiers={(DOMAIN, "IOT")}):
+        device_registry.async_update_device(
+            device.id, remove_config_entry_id=entry.entry_id
+        )
+
+    @callback
+    def _async_check_new_platforms(names, zone_ids):
+        """Reload once a skipped platform gains its first devices."""
+        if any(p not in api.platforms for p in _platforms_for(api)):
+            hass.config_entries.async_schedule_reload(entry.entry_id)
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_NEW_DEVICES.format(entry.entry_id), _async_check_new_platforms
+        )
+    )
+    # 플랫폼을 설정하는 동안 백그라운드 갱신이 새 종류의 장치를 가져왔을 수 있음
+    _async_check_new_platforms([], [])
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
 
     return True
 
 
+def _platforms_for(api: InshowApi) -> list[Platform]:
+    """Return the platforms that have at least one device."""
+    platforms = []
+    if api.request_keys_for_light() or api.request_zone_ids():
+        platforms.append(Platform.LIGHT)
+    if api.request_keys_for_climate():
+        platforms.append(Platform.CLIMATE)
+    # 계측 sensor는 장치 유무와 관계없이 항상 제공
+    platforms.append(Platform.SENSOR)
+    return platforms
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: InshowConfigEntry) -> None:
+    """Reload the entry when its options change."""
+    api = entry.runtime_data
+    # transport가 바뀌면 새로 연결해야 하므로 연결을 유지하지 않음
+    api.keep_warm = entry.options.get(
+        CONF_KEEP_CONNECTION, DEFAULT_KEEP_CONNECTION
+    ) and entry.options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT) == api.transport
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: InshowConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    api = entry.runtime_data
+    if not await hass.config_entries.async_unload_platforms(entry, api.platforms):
+        return False
+    if api.keep_warm:
+        hass.data.setdefault(DOMAIN, {}).setdefault("warm", {})[entry.entry_id] = api
+    else:
+        await api.async_shutdown()
+    return True
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: InshowConfigEntry) -> None:
+    """Close a connection kept for a reload that never happened and drop the cache."""
+    warm = hass.data.get(DOMAIN, {}).get("warm", {})
+    if (api := warm.pop(entry.entry_id, None)) is not None:
+        await api.async_shutdown()
+    await async_remove_topology(hass, entry.entry_id)
@@ -1,156 +1,1755 @@
-import aiohttp
 import logging
 import paho.mqtt.client as mqtt
 import ssl
 import random
-import string
 import asyncio
-from korean_romanizer.romanizer import Romanizer
+import threading
+import time
+import base64
+import hashlib
+import secrets
+import importlib
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from datetime import timedelta
 import json
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers import instance_id
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.helpers.storage import Store
 
+from .const import (
+    CONF_COMMAND_WINDOW,
+    CONF_CONFIRM_TIMEOUT,
+    CONF_MAX_INFLIGHT,
+    CONF_POLL_INTERVAL,
+    CONF_RECONCILE_INTERVAL,
+    CONF_RECORD_TRAFFIC,
+    CONF_TEMP_HYSTERESIS,
+    CONF_TEMP_MIN_INTERVAL,
+    CONF_TRANSPORT,
+    DEFAULT_COMMAND_WINDOW,
+    DEFAULT_CONFIRM_TIMEOUT,
+    DEFAULT_MAX_INFLIGHT,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_RECONCILE_INTERVAL,
+    DEFAULT_RECORD_TRAFFIC,
+    DEFAULT_TEMP_HYSTERESIS,
+    DEFAULT_TEMP_MIN_INTERVAL,
+    DEFAULT_TRANSPORT,
+    DOMAIN,
+    MODE_POLLING,
+    MODE_PUSH,
+    SIGNAL_CLIMATE_UPDATE,
+    SIGNAL_DEVICE_REMOVED,
+    SIGNAL_LIGHT_UPDATE,
+    SIGNAL_NEW_DEVICES,
+    SIGNAL_ZONE_UPDATE,
+    TRANSPORT_EVENT_LOOP,
+    TRANSPORT_THREAD,
+)
+from .traffic import DIRECTION_IN, DIRECTION_OUT, InshowTrafficRecorder
 
-# TODO 1. 시간마다 토큰 다시 받기
-# TODO 2. MQTT 메시지 처리하기
-# TODO 2-1. state/changed topic에서 메시지 받으면 light entity에서 받아서 처리하기
-# TODO 2-2. HA에서 turn on/off 시 state/control topic으로 메시지 publish하기
-class InshowApi:
-    def __init__(self, hass, client_id, client_pw):
+# REST API와 MQTT broker (로컬 stand-in 서버로 replay/benchmark 할 때 교체)
+BASE_URL = "https://iot.interiorshow.kr/api"
+BROKER_HOST = "iot.interiorshow.kr"
+BROKER_PORT = 443
+BROKER_TLS = True
+
+# event loop transport에서 한 번의 read 콜백으로 처리할 최대 패킷 수
+MAX_PACKETS_TO_READ = 500
+MISC_LOOP_INTERVAL = 1
+# 재연결 backoff (초): min(MAX, MIN * 2^n)에 jitter 적용
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 120
+# paho 스레드의 자체 재연결은 관리형 재연결이 멈추기 전에 동작하지 않도록 늦춤
+PAHO_RECONNECT_DELAY = 3600
+
+# 명령 왕복 지연 histogram 경계 (초); 마지막 칸은 그 이상
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+# 온도조절기 전원은 주기적인 ROOMTEMPREAL 보고로만 확인되므로 보고 주기만큼 기다림 (초)
+CLIMATE_CONFIRM_TIMEOUT = 600
+
+# topic 분류 (payload를 파싱하기 전에 topic만으로 결정)
+ROUTE_LIGHT = "light"
+ROUTE_CLIMATE = "climate"
+ROUTE_ZONE = "zone"
+# 한 SUBSCRIBE 패킷에 담을 최대 topic 수
+MAX_TOPICS_PER_SUBSCRIBE = 200
+# 한 번의 async_add_entities에 모을 엔티티 수 (controller는 나누지 않음)
+ENTITY_BATCH_SIZE = 32
+
+# MQTT 상태 감시 주기 / 주기적으로 보고하던 controller가 모두 이 시간 동안 조용하면 stale로 봄
+SUPERVISOR_INTERVAL = timedelta(seconds=30)
+STALE_TIMEOUT = 600
+
+# access token 수명 (JWT exp가 없을 때) 및 만료 전 미리 갱신할 여유 시간 (초)
+TOKEN_LIFETIME = 3600
+TOKEN_REFRESH_MARGIN = 300
+TOKEN_RETRY_DELAY = 60
+
+STORAGE_VERSION = 1
+# 가공된 topology(state store, zones) 캐시
+TOPOLOGY_STORAGE_VERSION = 2
+
+
+def _backoff_delay(attempt):
+    """Return a jittered exponential reconnect delay."""
+    delay = min(RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY * 2**attempt)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _token_expiry(token):
+    """Return the expiry timestamp of a JWT access token."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return time.time() + TOKEN_LIFETIME
+
+
+class _TopologyStore(Store):
+    """Topology cache; snapshots in an older layout are simply refetched."""
+
+    async def _async_migrate_func(self, old_major_version, old_minor_version, old_data):
+        return {}
+
+
+async def async_remove_topology(hass, entry_id):
+    """Delete the topology cache of a removed config entry."""
+    store = _TopologyStore(hass, TOPOLOGY_STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+    await store.async_remove()
+
+
+class InshowLightState:
+    """State record of one light port."""
+
+    __slots__ = (
+        "name",
+        "device_id",
+        "controller_id",
+        "port",
+        "zone_id",
+        "onoff",
+        "bright",
+        "color",
+    )
+
+    def __init__(
+        self, name, device_id, controller_id, port, zone_id, onoff, bright, color
+    ):
+        self.name = name
+        self.device_id = device_id
+        self.controller_id = controller_id
+        self.port = port
+        self.zone_id = zone_id
+        self.onoff = onoff
+        self.bright = bright
+        self.color = color
+
+    @classmethod
+    def from_device(cls, name, device, zone_id):
+        item = device["item"]
+        return cls(
+            name,
+            device["_id"],
+            device["controllerId"],
+            item.get("ports")[0],
+            zone_id,
+            item.get("onoff"),
+            item.get("bright"),
+            item.get("color"),
+        )
+
+    @property
+    def state(self):
+        return (self.onoff, self.bright, self.color)
+
+    def apply(self, data):
+        """Apply the data part of a state/changed or zone control message."""
+        self.onoff = data.get("onoff", self.onoff)
+        self.bright = data.get("bright", self.bright)
+        self.color = data.get("color", self.color)
+
+    def copy_state(self, other):
+        self.onoff, self.bright, self.color = other.state
+
+    def as_list(self):
+        return [getattr(self, slot) for slot in self.__slots__]
+
+
+class InshowClimateState:
+    """State record of one thermostat controller."""
+
+    __slots__ = (
+        "name",
+        "device_id",
+        "controller_id",
+        "zone_id",
+        "current_temp",
+        "target_temp",
+        "onoff",
+        "pattern",
+    )
+
+    def __init__(
+        self,
+        name,
+        device_id,
+        controller_id,
+        zone_id,
+        current_temp,
+        target_temp,
+        onoff,
+        pattern,
+    ):
+        self.name = name
+        self.device_id = device_id
+        self.controller_id = controller_id
+        self.zone_id = zone_id
+        self.current_temp = current_temp
+        self.target_temp = target_temp
+        self.onoff = onoff
+        self.pattern = pattern
+
+    @classmethod
+    def from_device(cls, name, device, zone_id):
+        item = device["item"]
+        pattern = item.get("pattern")
+        return cls(
+            name,
+            device["_id"],
+            device["controllerId"],
+            zone_id,
+            float(item.get("currentTemp")),
+            float(item.get("targetTemp")),
+            item.get("onoff") == 1,
+            None if pattern is None else str(pattern),
+        )
+
+    @property
+    def state(self):
+        return (self.current_temp, self.target_temp, self.onoff, self.pattern)
+
+    def apply(self, data):
+        """Apply a stat/inshow message."""
+        # {'Temperature': 25.5, 'POWER_RL': 'OFF'} on .../ROOMTEMPREAL
+        # {'AwayModeSet': 0} on .../AWAYMODESET
+        # {'TempTargetSet': 23.0} on .../TEMPTARGETSET
+        # {'PatternModeSet': 1} on .../PATTERNMODESET
+        if "Temperature" in data:
+            self.current_temp = float(data["Temperature"])
+            self.onoff = data.get("POWER_RL", "OFF") == "ON"
+        if "AwayModeSet" in data:
+            self.onoff = data["AwayModeSet"] == 0
+        if "TempTargetSet" in data:
+            self.target_temp = float(data["TempTargetSet"])
+        if "PatternModeSet" in data:
+            self.pattern = str(data["PatternModeSet"])
+
+    def copy_state(self, other):
+        (self.current_temp, self.target_temp, self.onoff, self.pattern) = other.state
+
+    def as_list(self):
+        return [getattr(self, slot) for slot in self.__slots__]
+
+
+class InshowStateStore:
+    """Device records by name, with O(1) indexes by controller and port."""
+
+    def __init__(self):
+        self.lights = {}
+        self.climates = {}
+        self.light_index = {}
+        self.climate_index = {}
+
+    def add(self, record):
+        if isinstance(record, InshowClimateState):
+            self.climates[record.name] = record
+            self.climate_index[record.controller_id] = record
+        else:
+            self.lights[record.name] = record
+            self.light_index[(record.controller_id, record.port)] = record
+
+    def get(self, name):
+        return self.lights.get(name) or self.climates.get(name)
+
+    def names(self):
+        return self.lights.keys() | self.climates.keys()
+
+    def controller_ids(self):
+        return {key[0] for key in self.light_index} | self.climate_index.keys()
+
+    def as_dict(self):
+        return {
+            "lights": [record.as_list() for record in self.lights.values()],
+            "climates": [record.as_list() for record in self.climates.values()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        store = cls()
+        for values in data["lights"]:
+            store.add(InshowLightState(*values))
+        for values in data["climates"]:
+            store.add(InshowClimateState(*values))
+        return store
+
+
+class InshowNameService:
+    """Romanize zone and group names once and keep them across restarts."""
+
+    def __init__(self, hass):
+        self.hass = hass
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.names")
+        self._names = None
+        self._romanizer = None
+
+    async def async_romanize_all(self, texts):
+        """Make sure every text has a cached romanization."""
+        if self._names is None:
+            self._names = await self._store.async_load() or {}
+        missing = {text for text in texts if text not in self._names}
+        if not missing:
+            return
+        if self._romanizer is None:
+            # korean_romanizer는 실제로 새 이름이 있을 때만 import
+            module = await self.hass.async_add_import_executor_job(
+                importlib.import_module, "korean_romanizer.romanizer"
+            )
+            self._romanizer = module.Romanizer
+        for text in missing:
+            self._names[text] = self._romanizer(text).romanize()
+        await self._store.async_save(self._names)
+
+    def romanize(self, text):
+        return self._names[text]
+
+
+def async_get_name_service(hass):
+    """Return the name service shared by every config entry."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if "names" not in domain_data:
+        domain_data["names"] = InshowNameService(hass)
+    return domain_data["names"]
+
+
+async def _async_get_client_salt(hass):
+    """Return a random salt created once for this installation."""
+    store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.client")
+    if not (data := await store.async_load()):
+        data = {"salt": secrets.token_hex(8)}
+        await store.async_save(data)
+    return data["salt"]
+
+
+def async_get_connection(hass, transport):
+    """Return the broker connection shared by every config entry on a transport."""
+    connections = hass.data.setdefault(DOMAIN, {}).setdefault("connections", {})
+    if (connection := connections.get(transport)) is None:
+        connection = connections[transport] = InshowConnection(hass, transport)
+    return connection
+
+
+class InshowConnection:
+    """Broker connection shared by every config entry that uses the same transport."""
+
+    def __init__(self, hass, transport):
         self.hass = hass
         self._LOGGER = logging.getLogger(__name__)
-        self.token = None
-        self.base_url = "https://iot.interiorshow.kr/api"
-        self.client_id = client_id
-        self.client_pw = client_pw
-        self.data = None
+        self.transport = transport
         self.client = None
+        self._apis = []
+        # topic별 참조 수: 마지막 entry가 놓을 때만 UNSUBSCRIBE
+        self._topic_refs = {}
+        # 연결이 끊겨 보내지 못한 SUBSCRIBE는 재연결 시 다시 보냄
+        self._unsent = set()
+        self._connect_lock = asyncio.Lock()
+        self._misc_timer = None
+        self._stopping = False
+        self._reconnect_task = None
+        self._disconnected_at = None
+        # 어느 entry의 topology에도 속하지 않아 버린 메시지 수
+        self.unrouted_messages = 0
 
-    async def initialize(self):
-        url = f"{self.base_url}/authorize/signIn"
-        data = {"type": "e", "email": self.client_id, "password": self.client_pw}
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, data=data) as response:
-                    response_data = await response.json()
-                    self.token = response_data.get("resultData").get("accessToken")
-                    if self.token:
-                        self._LOGGER.debug(f"Access token received: {self.token}")
-                    else:
-                        self._LOGGER.error("Failed to retrieve access token")
-        except Exception as e:
-            self._LOGGER.error(f"Error during token retrieval: {e}")
+    async def async_add_api(self, api):
+        """Attach an entry, connecting first if it is the only one."""
+        async with self._connect_lock:
+            if self.client is None:
+                await self._async_connect()
+        if api not in self._apis:
+            # MQTT 스레드에서 순회하므로 새 list로 교체
+            self._apis = [*self._apis, api]
+
+    async def async_remove_api(self, api, topics):
+        """Detach an entry and its topics, closing the connection after the last one."""
+        self._apis = [other for other in self._apis if other is not api]
+        self.unsubscribe(topics)
+        if self._apis:
+            return
+        domain_data = self.hass.data.get(DOMAIN, {})
+        if domain_data.get("connections", {}).get(self.transport) is self:
+            del domain_data["connections"][self.transport]
+        await self._async_close()
+
+    async def _async_connect(self):
+        """Create the paho client and connect to the broker."""
 
         def on_connect(client, userdata, flags, rc):
             if rc == 0:
                 self._LOGGER.info("Connected to MQTT broker successfully")
             else:
-                self._LOGGER.error(f"Failed to connect, return code {rc}")
-
-        def on_message(client, userdata, msg):
-            try:
-                data = json.loads(msg.payload.decode())                
-                if 'serial' in data:
-                    self.hass.loop.call_soon_threadsafe(
-                        async_dispatcher_send, self.hass, "inshow_light_update", data
-                    )                    
-                else:
-                    data['controllerId'] = msg.topic.split('/')[2]
-                    self.hass.loop.call_soon_threadsafe(
-                    async_dispatcher_send, self.hass, "inshow_climate_update", data
-                    )
-                self._LOGGER.debug(f"Received message '{data}' on topic '{msg.topic}'")
-            except Exception as e:
-                self._LOGGER.error(f"Error in on_message: {e}")
+                self._LOGGER.error("Failed to connect, return code %s", rc)
+            self._run_on_loop(self._async_on_connect, flags, rc)
 
         def on_disconnect(client, userdata, rc):
-            self._LOGGER.warning(f"Disconnected with result code {rc}")
+            self._LOGGER.warning("Disconnected with result code %s", rc)
+            self._run_on_loop(self._async_on_disconnect, rc)
 
+        def on_publish(client, userdata, mid):
+            # event loop transport에서는 publish() 안에서 바로 호출될 수 있으므로
+            # mid가 기록된 뒤에 처리되도록 항상 다음 tick으로 넘김
+            self.hass.loop.call_soon_threadsafe(self._async_on_publish, mid)
+
+        # 재연결 시 broker의 persistent session을 이어받도록 고정된 client id 사용
+        # (broker는 익명 접속이라 계정과 무관하게 HA 인스턴스당 하나의 연결을 공유)
+        # instance id는 backup 복원 시 그대로 복사되므로 설치마다 만든 salt를 섞음
         base_client_id = "inshow_mobile"
-        random_suffix = "".join(
-            random.choices(string.ascii_lowercase + string.digits, k=8)
-        )
-        client_id = f"{base_client_id}_{random_suffix}"
+        instance = await instance_id.async_get(self.hass)
+        salt = await _async_get_client_salt(self.hass)
+        stable_suffix = hashlib.sha1(
+            f"{instance}:{salt}:{self.transport}".encode()
+        ).hexdigest()[:8]
+        client_id = f"{base_client_id}_{stable_suffix}"
 
-        self.client = mqtt.Client(client_id=client_id, transport="websockets")
+        client = mqtt.Client(
+            client_id=client_id, clean_session=False, transport="websockets"
+        )
+        client.reconnect_delay_set(PAHO_RECONNECT_DELAY, PAHO_RECONNECT_DELAY)
 
         # SSL 설정
-        await asyncio.to_thread(self.client.tls_set, cert_reqs=ssl.CERT_NONE)
-        await asyncio.to_thread(self.client.tls_insecure_set, True)
+        if BROKER_TLS:
+            await asyncio.to_thread(client.tls_set, cert_reqs=ssl.CERT_NONE)
+            await asyncio.to_thread(client.tls_insecure_set, True)
 
         # WebSocket 연결 설정
-        self.client.ws_set_options(path="/ws")
+        client.ws_set_options(path="/ws")
 
         # 콜백 함수 등록
-        self.client.on_connect = on_connect
-        self.client.on_message = on_message
-        self.client.on_disconnect = on_disconnect
+        client.on_connect = on_connect
+        client.on_message = self._on_message
+        client.on_disconnect = on_disconnect
+        client.on_publish = on_publish
+        if self.transport == TRANSPORT_EVENT_LOOP:
+            # paho 소켓을 HA event loop에서 직접 구동 (별도 네트워크 스레드 없음)
+            client.on_socket_open = self._on_socket_open
+            client.on_socket_close = self._on_socket_close
+            client.on_socket_register_write = self._on_socket_register_write
+            client.on_socket_unregister_write = self._on_socket_unregister_write
 
         # MQTT 브로커에 연결
-        broker_host = "iot.interiorshow.kr"
-        broker_port = 443
-        await asyncio.to_thread(self.client.connect, broker_host, broker_port, 60)
+        self.client = client
+        try:
+            await asyncio.to_thread(client.connect, BROKER_HOST, BROKER_PORT, 60)
+        except Exception as e:
+            # 연결하지 못해도 entry는 REST polling으로 동작하고 재연결은 계속 시도
+            self._LOGGER.warning("Could not connect to MQTT broker: %s", e)
+            self._async_on_disconnect(mqtt.MQTT_ERR_CONN_LOST)
+            return
+
+        if self.transport == TRANSPORT_THREAD:
+            self.client.loop_start()
+
+    @property
+    def connected(self):
+        return self.client is not None and self.client.is_connected()
+
+    def _on_message(self, client, userdata, msg):
+        """Route, parse and queue one received message (MQTT thread or replay)."""
+        data = None
+        for api in self._apis:
+            # 알 수 없는 controller/zone의 메시지는 파싱 전에 버림
+            if (route := api._route(msg.topic)) is None:
+                continue
+            if api.recorder is not None:
+                api.recorder.record(DIRECTION_IN, msg.topic, msg.payload)
+            api.message_counts[route[0]] += 1
+            # 여러 entry가 같은 topic을 구독해도 payload는 한 번만 파싱
+            if data is None:
+                try:
+                    data = _json_loads(msg.payload)
+                except ValueError as e:
+                    api.stats["parse_failures"] += 1
+                    self._LOGGER.error(
+                        "Invalid payload on topic %s: %s", msg.topic, e
+                    )
+                    return
+                if not isinstance(data, dict):
+                    api.stats["parse_failures"] += 1
+                    return
+                # hot path라 debug가 꺼져 있으면 로그 호출 자체를 건너뜀
+                if self._LOGGER.isEnabledFor(logging.DEBUG):
+                    self._LOGGER.debug(
+                        "Received message %s on topic %s", data, msg.topic
+                    )
+            api._enqueue_message(route, data)
+        if data is None:
+            self.unrouted_messages += 1
+
+    async def _async_close(self):
+        self._stopping = True
+        if self._misc_timer is not None:
+            self._misc_timer.cancel()
+            self._misc_timer = None
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self.client is None:
+            return
+        self.client.disconnect()
+        if self.transport == TRANSPORT_THREAD:
+            await self.hass.async_add_executor_job(self.client.loop_stop)
+        self.client = None
+        self._topic_refs.clear()
+        self._unsent.clear()
+
+    def subscribe(self, topics):
+        """Take a reference on each topic, subscribing to the new ones in few packets."""
+        new_topics = []
+        for topic in topics:
+            refs = self._topic_refs.get(topic, 0)
+            self._topic_refs[topic] = refs + 1
+            if not refs:
+                new_topics.append(topic)
+        self._async_send_subscribe(new_topics)
+
+    def unsubscribe(self, topics):
+        """Drop a reference on each topic, unsubscribing once nobody uses it."""
+        unused = []
+        for topic in topics:
+            refs = self._topic_refs.get(topic, 0) - 1
+            if refs > 0:
+                self._topic_refs[topic] = refs
+            elif self._topic_refs.pop(topic, None) is not None:
+                unused.append(topic)
+        if self.client is None:
+            return
+        for i in range(0, len(unused), MAX_TOPICS_PER_SUBSCRIBE):
+            self.client.unsubscribe(unused[i : i + MAX_TOPICS_PER_SUBSCRIBE])
+
+    def _async_send_subscribe(self, topics):
+        if self.client is None:
+            return
+        for i in range(0, len(topics), MAX_TOPICS_PER_SUBSCRIBE):
+            chunk = topics[i : i + MAX_TOPICS_PER_SUBSCRIBE]
+            result, _ = self.client.subscribe([(topic, 0) for topic in chunk])
+            if result != mqtt.MQTT_ERR_SUCCESS:
+                self._unsent.update(chunk)
+
+    def publish(self, topic, msg, qos=0):
+        """Publish an MQTT message."""
+        if self.client is None:
+            self._LOGGER.warning("MQTT client is not connected yet")
+            return None
+        return self.client.publish(topic=topic, payload=msg, qos=qos)
+
+    @callback
+    def _async_on_connect(self, flags, rc):
+        if rc != 0:
+            return
+        # broker에 세션이 남아있지 않으면 모든 entry의 topic을 한 번에 다시 구독
+        if flags.get("session present"):
+            topics = [topic for topic in self._unsent if topic in self._topic_refs]
+        else:
+            topics = list(self._topic_refs)
+        self._unsent.clear()
+        self._async_send_subscribe(topics)
+        if self._disconnected_at is not None:
+            for api in self._apis:
+                api._async_on_reconnect(self._disconnected_at)
+            self._disconnected_at = None
+
+    @callback
+    def _async_on_disconnect(self, rc):
+        for api in self._apis:
+            api._async_reset_inflight()
+        if self._stopping or rc == mqtt.MQTT_ERR_SUCCESS:
+            return
+        if self._disconnected_at is None:
+            self._disconnected_at = time.monotonic()
+        if self._reconnect_task is None:
+            self._reconnect_task = self.hass.async_create_background_task(
+                self._async_reconnect(), "inshow_mqtt_reconnect"
+            )
+
+    @callback
+    def _async_on_publish(self, mid):
+        for api in self._apis:
+            api._async_on_publish(mid)
+
+    async def _async_reconnect(self):
+        """Reconnect with jittered exponential backoff."""
+        try:
+            if self.transport == TRANSPORT_THREAD:
+                # paho 스레드의 자체 재연결 대신 여기서 재연결을 관리
+                await self.hass.async_add_executor_job(self.client.loop_stop)
+            attempt = 0
+            while not self._stopping:
+                delay = _backoff_delay(attempt)
+                self._LOGGER.debug("Reconnecting to MQTT broker in %.1fs", delay)
+                await asyncio.sleep(delay)
+                try:
+                    await asyncio.to_thread(self.client.reconnect)
+                except Exception as e:
+                    attempt += 1
+                    self._LOGGER.warning(
+                        "MQTT reconnect attempt %s failed: %s", attempt, e
+                    )
+                    continue
+                if self.transport == TRANSPORT_THREAD:
+                    self.client.loop_start()
+                return
+        finally:
+            self._reconnect_task = None
+
+    def _run_on_loop(self, target, *args):
+        """Run target on the event loop, hopping threads only when needed."""
+        if threading.get_ident() == self.hass.loop_thread_id:
+            target(*args)
+        else:
+            self.hass.loop.call_soon_threadsafe(target, *args)
+
+    def _on_socket_open(self, client, userdata, sock):
+        self._run_on_loop(self._async_on_socket_open, client, sock)
+
+    def _on_socket_close(self, client, userdata, sock):
+        # paho는 소켓을 닫기 직전에 호출하므로 fd가 유효할 때 바로 해제해야 함
+        if threading.get_ident() == self.hass.loop_thread_id:
+            self._async_on_socket_close(client, sock)
+        else:
+            self.hass.loop.call_soon_threadsafe(
+                self._async_on_socket_close, client, sock
+            )
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self._run_on_loop(self._async_on_socket_register_write, client, sock)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self._run_on_loop(self._async_on_socket_unregister_write, client, sock)
+
+    @callback
+    def _async_on_socket_open(self, client, sock):
+        if sock.fileno() > -1:
+            self.hass.loop.add_reader(sock, self._async_reader_callback, client)
+        if self._misc_timer is None:
+            self._misc_timer = self.hass.loop.call_later(
+                MISC_LOOP_INTERVAL, self._async_misc_loop, client
+            )
+        # 연결 중 이미 도착한 데이터가 있을 수 있으므로 바로 한 번 읽음
+        self._async_reader_callback(client)
+
+    @callback
+    def _async_on_socket_close(self, client, sock):
+        if sock.fileno() > -1:
+            self.hass.loop.remove_reader(sock)
+            self.hass.loop.remove_writer(sock)
+
+    @callback
+    def _async_on_socket_register_write(self, client, sock):
+        if sock.fileno() > -1:
+            self.hass.loop.add_writer(sock, self._async_writer_callback, client)
 
-        self.client.loop_start()
+    @callback
+    def _async_on_socket_unregister_write(self, client, sock):
+        if sock.fileno() > -1:
+            self.hass.loop.remove_writer(sock)
 
-    async def get_data(self):
+    @callback
+    def _async_reader_callback(self, client):
+        client.loop_read(MAX_PACKETS_TO_READ)
+        # TLS 계층에 남아있는 데이터는 select에 잡히지 않으므로 이어서 처리
+        sock = client.socket()
+        if sock is not None and sock.pending():
+            self.hass.loop.call_soon(self._async_reader_callback, client)
+
+    @callback
+    def _async_writer_callback(self, client):
+        client.loop_write()
+
+    @callback
+    def _async_misc_loop(self, client):
+        # keepalive ping, 재시도 등 paho의 주기 작업
+        if self._stopping:
+            self._misc_timer = None
+            return
+        client.loop_misc()
+        self._misc_timer = self.hass.loop.call_later(
+            MISC_LOOP_INTERVAL, self._async_misc_loop, client
+        )
+
+
+# TODO 2. MQTT 메시지 처리하기
+# TODO 2-1. state/changed topic에서 메시지 받으면 light entity에서 받아서 처리하기
+# TODO 2-2. HA에서 turn on/off 시 state/control topic으로 메시지 publish하기
+class InshowApi:
+    def __init__(self, hass, client_id, client_pw, options=None, entry_id=None):
+        self.hass = hass
+        self._LOGGER = logging.getLogger(__name__)
+        self.token = None
+        self.token_expires = 0
+        self._token_lock = asyncio.Lock()
+        self._unsub_token_refresh = None
+        self._unsub_reconcile = None
+        self._unsub_supervisor = None
+        # MQTT가 끊기거나 멈추면 /zones polling으로 전환
+        self.mode = MODE_PUSH
+        self._last_poll = 0.0
+        self._poll_task = None
+        # controllerId -> 마지막으로 메시지를 받은 시각 (monotonic)
+        self.last_message = {}
+        # /zones conditional request용 validator (서버가 주는 경우에만)
+        self._zones_etag = None
+        self._zones_last_modified = None
+        self._zones_lock = asyncio.Lock()
+        # HA 공용 세션을 사용해 TCP/TLS 연결을 재사용
+        self.session = async_get_clientsession(hass)
+        self.base_url = BASE_URL
+        self.client_id = client_id
+        self.client_pw = client_pw
+        self.store = InshowStateStore()
+        self.zones = {}
+        self.connection = None
+        self.entry_id = entry_id
+        self._topology_store = _TopologyStore(
+            hass, TOPOLOGY_STORAGE_VERSION, f"{DOMAIN}.{entry_id}"
+        )
+        # 마지막으로 저장/로드한 topology: 바뀌지 않았으면 다시 쓰지 않음
+        self._saved_topology = None
+        self._subscribed = set()
+        self._routes = {}
+        self.platforms = []
+        # 플랫폼 setup이 시작된 뒤로는 topology 변경을 signal로 알림
+        self.entities_loaded = False
+        self.keep_warm = False
+        self.names = async_get_name_service(hass)
+        options = options or {}
+        self.transport = options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
+        self._pending_commands = {}
+        self._command_timers = {}
+        # 조명 명령은 controller 단위로 모아 같은 상태의 port들을 한 메시지로 발행
+        self._light_commands = {}
+        self._light_timers = {}
+        self._command_backlog = OrderedDict()
+        self._inflight = set()
+        # 발행한 명령의 확인 대기: (controllerId, port|field) -> (기대 값, 발행 시각, 이름, timer)
+        self._awaiting = {}
+        # 확인이 오지 않아 unavailable로 표시한 레코드 이름
+        self.unconfirmed = set()
+        self._refresh_task = None
+        self._resync_task = None
+        # controllerId -> LATENCY_BUCKETS 칸별 횟수 / timeout 횟수
+        self.latency_histograms = {}
+        self.command_timeouts = {}
+        self.stats = {
+            "state_writes": 0,
+            "state_writes_suppressed": 0,
+            "drains": 0,
+            "drained_messages": 0,
+            "last_drain_size": 0,
+            "max_drain_size": 0,
+            "last_drain_ms": 0.0,
+            "max_drain_ms": 0.0,
+            "reconnects": 0,
+            "last_recovery_s": None,
+            "reconciles": 0,
+            "zones_not_modified": 0,
+            "topology_saves": 0,
+            "last_drift": 0,
+            "total_drift": 0,
+            "confirmed": 0,
+            "confirm_timeouts": 0,
+            "parse_failures": 0,
+            "publishes": 0,
+            "publish_failures": 0,
+            "last_dispatch_ms": 0.0,
+            "max_dispatch_ms": 0.0,
+            "total_dispatch_ms": 0.0,
+            "mode_changes": 0,
+            "degraded_polls": 0,
+        }
+        # topic 분류별 수신 메시지 수 (MQTT 스레드에서 증가)
+        self.message_counts = {ROUTE_LIGHT: 0, ROUTE_CLIMATE: 0, ROUTE_ZONE: 0}
+        self._stopping = False
+        # 옵션으로 켜는 raw 트래픽 기록
+        self.recorder = None
+        self.apply_options(options)
+        # MQTT 스레드 -> event loop 수신 큐
+        self._inbox = deque()
+        self._drain_scheduled = False
+        # drain을 예약한 시각 (dispatch 지연 측정용)
+        self._drain_requested_at = 0.0
+
+    def apply_options(self, options):
+        """Apply the options that can change without reconnecting."""
+        # 명령 coalescing: 같은 key의 명령은 window 안에서 마지막 값만 발행
+        self.command_window = (
+            options.get(CONF_COMMAND_WINDOW, DEFAULT_COMMAND_WINDOW) / 1000
+        )
+        self.max_inflight = options.get(CONF_MAX_INFLIGHT, DEFAULT_MAX_INFLIGHT)
+        # 현재 온도는 변화량/간격 조건을 넘을 때만 상태 기록
+        self.temp_hysteresis = options.get(
+            CONF_TEMP_HYSTERESIS, DEFAULT_TEMP_HYSTERESIS
+        )
+        self.temp_min_interval = options.get(
+            CONF_TEMP_MIN_INTERVAL, DEFAULT_TEMP_MIN_INTERVAL
+        )
+        self.reconcile_interval = (
+            options.get(CONF_RECONCILE_INTERVAL, DEFAULT_RECONCILE_INTERVAL) * 60
+        )
+        self._async_schedule_reconcile()
+        self.confirm_timeout = options.get(
+            CONF_CONFIRM_TIMEOUT, DEFAULT_CONFIRM_TIMEOUT
+        )
+        self.poll_interval = options.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL)
+        record = options.get(CONF_RECORD_TRAFFIC, DEFAULT_RECORD_TRAFFIC)
+        if record and self.recorder is None:
+            self.recorder = InshowTrafficRecorder(
+                self.hass,
+                self.hass.config.path(f"{DOMAIN}_traffic_{self.entry_id}.bin"),
+            )
+            self.recorder.async_start()
+        elif not record and self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            self.hass.async_create_task(recorder.async_stop())
+
+    async def async_shutdown(self):
+        """Flush pending commands, then stop timers and release the broker connection."""
+        self._stopping = True
+        # 대기 중인 명령은 버리지 않고 바로 발행
+        for controller_id in list(self._light_timers):
+            self._light_timers.pop(controller_id).cancel()
+            self._async_flush_light_commands(controller_id)
+        for key in list(self._command_timers):
+            self._command_timers.pop(key).cancel()
+            self._async_flush_command(key)
+        self._command_backlog.clear()
+        for *_, timer in self._awaiting.values():
+            timer.cancel()
+        self._awaiting.clear()
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        if self._resync_task is not None:
+            self._resync_task.cancel()
+        if self._unsub_token_refresh is not None:
+            self._unsub_token_refresh()
+            self._unsub_token_refresh = None
+        if self._unsub_reconcile is not None:
+            self._unsub_reconcile()
+            self._unsub_reconcile = None
+        if self._unsub_supervisor is not None:
+            self._unsub_supervisor()
+            self._unsub_supervisor = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            await recorder.async_stop()
+        if self.connection is None:
+            return
+        # 다른 entry가 쓰는 topic과 연결은 그대로 두고 참조만 놓음
+        connection, self.connection = self.connection, None
+        await connection.async_remove_api(self, self._subscribed)
+        self._subscribed = set()
+
+    async def async_login(self):
+        """Sign in and cache the access token until shortly before it expires."""
+        async with self._token_lock:
+            if self._stopping:
+                return False
+            url = f"{self.base_url}/authorize/signIn"
+            data = {"type": "e", "email": self.client_id, "password": self.client_pw}
+            try:
+                async with self.session.post(url, data=data) as response:
+                    response_data = await response.json()
+                    token = (response_data.get("resultData") or {}).get("accessToken")
+            except Exception as e:
+                self._LOGGER.error(f"Error during token retrieval: {e}")
+                token = None
+
+            if token:
+                self.token = token
+                self.token_expires = _token_expiry(token)
+                self._LOGGER.debug("Access token received")
+                delay = max(
+                    self.token_expires - time.time() - TOKEN_REFRESH_MARGIN,
+                    TOKEN_RETRY_DELAY,
+                )
+            else:
+                self._LOGGER.error("Failed to retrieve access token")
+                delay = TOKEN_RETRY_DELAY
+
+            # 로그인 도중 종료됐으면 갱신 timer를 다시 걸지 않음
+            if self._stopping:
+                return token is not None
+            # 만료 전에 백그라운드에서 미리 갱신
+            if self._unsub_token_refresh is not None:
+                self._unsub_token_refresh()
+            self._unsub_token_refresh = async_call_later(
+                self.hass, delay, self._async_scheduled_login
+            )
+            return token is not None
+
+    async def _async_scheduled_login(self, _now):
+        self._unsub_token_refresh = None
+        await self.async_login()
+
+    async def _async_request(self, method, path, **kwargs):
+        """Call the REST API, signing in again once if the token was rejected."""
+        if not self.token or time.time() >= self.token_expires:
+            await self.async_login()
         if not self.token:
             self._LOGGER.error("No access token available.")
-            return None
+            return None, None
+
+        extra_headers = kwargs.pop("headers", {})
+        for retry in (True, False):
+            token = self.token
+            headers = {**extra_headers, "Authorization": f"Bearer {token}"}
+            async with self.session.request(
+                method, f"{self.base_url}{path}", headers=headers, **kwargs
+            ) as response:
+                if response.status == 401 and retry:
+                    self._LOGGER.debug("Access token rejected, signing in again")
+                elif response.status == 304:
+                    return response, None
+                else:
+                    return response, await response.json()
+            # 다른 요청이 이미 갱신했으면 다시 로그인하지 않음
+            if self.token == token:
+                await self.async_login()
+
+    async def async_start(self):
+        """Connect to the broker while signing in and fetching /zones."""
+        timings = {}
+
+        async def _timed(phase, coro):
+            start = time.monotonic()
+            try:
+                return await coro
+            finally:
+                timings[phase] = time.monotonic() - start
+
+        async def _fetch():
+            await _timed("login", self.async_login())
+            return await _timed("zones", self.get_data())
+
+        start = time.monotonic()
+        _, result = await asyncio.gather(
+            _timed("mqtt_connect", self.async_connect_mqtt()), _fetch()
+        )
+        # topology를 알게 된 후 한 번의 SUBSCRIBE로 구독 (갱신 실패 시 캐시 기준)
+        subscribe_start = time.monotonic()
+        self.async_subscribe_topology()
+        timings["subscribe"] = time.monotonic() - subscribe_start
+        timings["total"] = time.monotonic() - start
+        self._LOGGER.debug(
+            "Startup timings: %s",
+            ", ".join(f"{phase}={value * 1000:.0f}ms" for phase, value in timings.items()),
+        )
+        return result
+
+    async def async_connect_mqtt(self):
+        """Attach to the broker connection shared by every entry on this transport."""
+        connection = async_get_connection(self.hass, self.transport)
+        await connection.async_add_api(self)
+        self.connection = connection
+        if self._unsub_supervisor is None:
+            self._unsub_supervisor = async_track_time_interval(
+                self.hass, self._async_supervise, SUPERVISOR_INTERVAL
+            )
+            # 시작 시에는 어차피 /zones를 받으므로 mode만 정하고 바로 polling하지 않음
+            self._last_poll = time.monotonic()
+            self._async_supervise()
+
+    def _mqtt_stale(self):
+        """Return True if the broker is down or every reporting controller went quiet."""
+        if self.connection is None or not self.connection.connected:
+            return True
+        # 조명은 바뀔 때만 보고하므로 실내 온도를 주기적으로 보고하는 온도조절기로만 판단
+        reported = [
+            self.last_message[controller_id]
+            for controller_id in self.store.climate_index
+            if controller_id in self.last_message
+        ]
+        if not reported:
+            return False
+        return time.monotonic() - max(reported) > STALE_TIMEOUT
+
+    @callback
+    def _async_supervise(self, _now=None):
+        """Switch between MQTT push and bulk /zones polling."""
+        if self._stopping:
+            return
+        mode = MODE_POLLING if self._mqtt_stale() else MODE_PUSH
+        if mode != self.mode:
+            self.mode = mode
+            self.stats["mode_changes"] += 1
+            if mode == MODE_POLLING:
+                self._LOGGER.warning(
+                    "MQTT stream is unavailable, polling /zones every %ss",
+                    self.poll_interval,
+                )
+            else:
+                self._LOGGER.info("MQTT stream recovered, back to push updates")
+        if (
+            mode == MODE_POLLING
+            and self._poll_task is None
+            and time.monotonic() - self._last_poll >= self.poll_interval
+        ):
+            self._poll_task = self.hass.async_create_background_task(
+                self._async_poll(), "inshow_degraded_poll"
+            )
+
+    async def _async_poll(self):
+        """Refresh every device with one conditional /zones request."""
+        try:
+            self._last_poll = time.monotonic()
+            if await self.get_data():
+                self.stats["degraded_polls"] += 1
+        finally:
+            self._poll_task = None
+
+    def _enqueue_message(self, route, data):
+        """Queue a routed message for the event loop (called from the MQTT thread)."""
+        # deque append는 thread-safe; event loop는 쌓인 메시지를 한 번에 처리
+        self._inbox.append((*route, data))
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self._drain_requested_at = time.perf_counter()
+            if threading.get_ident() == self.hass.loop_thread_id:
+                self.hass.loop.call_soon(self._async_drain_inbox)
+            else:
+                self.hass.loop.call_soon_threadsafe(self._async_drain_inbox)
+
+    @callback
+    def _async_on_reconnect(self, disconnected_at):
+        if self._stopping:
+            return
+        self._async_supervise()
+        # 끊긴 동안 쌓인 명령을 바로 발행
+        self._async_drain_backlog()
+        # 이미 진행 중인 재동기화가 있으면 그 get_data가 놓친 상태를 함께 가져옴
+        if self._resync_task is None:
+            self._resync_task = self.hass.async_create_background_task(
+                self._async_resync(disconnected_at), "inshow_mqtt_resync"
+            )
+
+    async def _async_resync(self, disconnected_at):
+        """Refetch /zones for state missed while disconnected and log the recovery time."""
+        try:
+            await self.get_data()
+            recovery = time.monotonic() - disconnected_at
+            self.stats["reconnects"] += 1
+            self.stats["last_recovery_s"] = round(recovery, 3)
+            self._LOGGER.info("MQTT state recovered %.1fs after disconnect", recovery)
+        finally:
+            self._resync_task = None
+
+    async def async_load_cached_topology(self):
+        """Load the topology saved by the last successful get_data."""
+        if not (cached := await self._topology_store.async_load()):
+            return False
+        self.store = InshowStateStore.from_dict(cached)
+        self.zones = cached["zones"]
+        self._saved_topology = cached
+        return True
 
-        headers = {"Authorization": f"Bearer {self.token}"}
+    @callback
+    def _async_schedule_reconcile(self):
+        if self._unsub_reconcile is not None:
+            self._unsub_reconcile()
+            self._unsub_reconcile = None
+        if self.reconcile_interval and not self._stopping:
+            self._unsub_reconcile = async_call_later(
+                self.hass, self.reconcile_interval, self._async_reconcile
+            )
+
+    async def _async_reconcile(self, _now):
+        """Refetch /zones to correct state that MQTT never delivered."""
+        self._unsub_reconcile = None
+        try:
+            if await self.get_data():
+                self.stats["reconciles"] += 1
+                self.stats["total_drift"] += self.stats["last_drift"]
+                self._LOGGER.debug(
+                    "Reconciliation found %d drifted devices",
+                    self.stats["last_drift"],
+                )
+        finally:
+            self._async_schedule_reconcile()
+
+    async def get_data(self, conditional=True):
+        """Fetch /zones and apply only the devices that changed."""
+        # 여러 경로(시작, reconcile, polling, resync, 확인 실패)의 조회를 한 번에 하나씩 처리해
+        # 오래된 응답이 새 응답 뒤에 반영되거나 validator가 뒤섞이지 않게 함
+        async with self._zones_lock:
+            return await self._async_get_data(conditional)
+
+    async def _async_get_data(self, conditional):
+        # 낙관적으로 바꾼 미확인 레코드는 서버 snapshot과 다르므로 304 없이 전체를 받음
+        if self.unconfirmed:
+            conditional = False
+        headers = {}
+        if conditional and self._zones_etag:
+            headers["If-None-Match"] = self._zones_etag
+        if conditional and self._zones_last_modified:
+            headers["If-Modified-Since"] = self._zones_last_modified
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.base_url}/zones", headers=headers
-                ) as response:
-                    datas = await response.json()
-                    datas = datas.get("resultData")
-
-                    controller = set()
-                    entityData = {}
-                    ids = []
-                    for data in datas:
-                        ids.append(data.get("_id"))
-                        for x in data["groups"]:
-                            prefix = Romanizer(x["name"]).romanize() + "_"
-                            for y in x["devices"]:
-                                if not y["isVirtual"]:
-                                    name = prefix + y["name"].replace("번", "")
-                                    entityData[name] = {
-                                        "pri_name": Romanizer(
-                                            data.get("name")
-                                        ).romanize(),
-                                        "id": y["_id"],
-                                        "controllerId": y["controllerId"],
-                                        "item": y["item"],
-                                    }
-                                    controller.add(y["controllerId"])
-                    self.data = entityData
-                    for id in ids:
-                        self.mqtt_subscribe(f"$MTZ/inshow/zone/{id}/state/control")
-                    for subs in controller:
-                        self.mqtt_subscribe(f"$MTZ/inshow/mcs/{subs}/state/changed")
-                        if subs.startswith("75DFISCA"):
-                            self.mqtt_subscribe(f"stat/inshow/{subs}/#")
-                    return True
+            response, datas = await self._async_request(
+                "GET", "/zones", headers=headers
+            )
+            if response is not None and response.status == 304:
+                # 마지막으로 반영한 snapshot 이후 서버 쪽 변경 없음
+                self.stats["zones_not_modified"] += 1
+                self.stats["last_drift"] = 0
+                return True
+            if datas is None:
+                return None
+            datas = datas.get("resultData")
+            await self.names.async_romanize_all(
+                [data.get("name") for data in datas]
+                + [x["name"] for data in datas for x in data["groups"]]
+            )
+            store, zones = self._parse_zones(datas)
         except Exception as e:
             self._LOGGER.error(f"Error during data retrieval: {e}")
             return False
 
+        self.stats["last_drift"] = self._async_apply_topology(store, zones)
+        self._async_restore_unconfirmed()
+        if response.status == 200:
+            self._zones_etag = response.headers.get("ETag")
+            self._zones_last_modified = response.headers.get("Last-Modified")
+        self.async_subscribe_topology()
+        # 종료 중에 저장하면 async_remove_topology가 지운 파일이 다시 생김
+        if self._stopping:
+            return True
+        topology = {**self.store.as_dict(), "zones": self.zones}
+        if topology != self._saved_topology:
+            await self._topology_store.async_save(topology)
+            self._saved_topology = topology
+            self.stats["topology_saves"] += 1
+        return True
+
+    def _parse_zones(self, datas):
+        store = InshowStateStore()
+        zones = {}
+        for data in datas:
+            zone_id = data.get("_id")
+            pri_name = self.names.romanize(data.get("name"))
+            zone = zones[zone_id] = {
+                "name": pri_name,
+                "members": [],
+            }
+            for x in data["groups"]:
+                prefix = self.names.romanize(x["name"]) + "_"
+                for y in x["devices"]:
+                    if not y["isVirtual"]:
+                        name = prefix + y["name"].replace("번", "")
+                        # raw item은 상태 값만 꺼내고 보관하지 않음
+                        if "75DFISCA" in name:
+                            store.add(InshowClimateState.from_device(name, y, zone_id))
+                        else:
+                            store.add(InshowLightState.from_device(name, y, zone_id))
+                            zone["members"].append(name)
+        return store, zones
+
+    @callback
+    def async_subscribe_topology(self):
+        """Subscribe to the topics of the current topology and drop the stale ones."""
+        topics = [f"$MTZ/inshow/zone/{id}/state/control" for id in self.zones]
+        for subs in self.store.controller_ids():
+            topics.append(f"$MTZ/inshow/mcs/{subs}/state/changed")
+            if subs.startswith("75DFISCA"):
+                topics.append(f"stat/inshow/{subs}/#")
+        self._build_routes()
+        if self.connection is None:
+            return
+        wanted = set(topics)
+        self.connection.unsubscribe(
+            [topic for topic in self._subscribed if topic not in wanted]
+        )
+        self._subscribed &= wanted
+        self.mqtt_subscribe_many(topics)
+
+    def _build_routes(self):
+        """Precompute the route of every exact topic of the current topology."""
+        routes = {
+            f"$MTZ/inshow/zone/{zone_id}/state/control": (ROUTE_ZONE, zone_id)
+            for zone_id in self.zones
+        }
+        for controller_id, _ in self.store.light_index:
+            routes[f"$MTZ/inshow/mcs/{controller_id}/state/changed"] = (
+                ROUTE_LIGHT,
+                controller_id,
+            )
+        # MQTT 스레드에서 읽으므로 새 dict로 통째로 교체
+        self._routes = routes
+
+    def _route(self, topic):
+        """Return (kind, id) for a topic, or None if it is not ours."""
+        if (route := self._routes.get(topic)) is not None:
+            return route
+        # stat/inshow/{cId}/# 는 wildcard라 처음 본 topic을 기억해 둠
+        if topic.startswith("stat/inshow/"):
+            controller_id = topic.split("/", 3)[2]
+            if controller_id in self.store.climate_index:
+                route = self._routes[topic] = (ROUTE_CLIMATE, controller_id)
+                return route
+        return None
+
+    @callback
+    def _async_apply_topology(self, store, zones):
+        """Swap in a fresh topology, touching only the devices that changed.
+
+        Returns the number of known devices whose state had drifted.
+        """
+        old_store = self.store
+        old_zones = self.zones
+        # 플랫폼이 아직 store에서 엔티티를 만들기 전이면 변경 signal을 보낼 대상이 없음
+        first_load = not self.entities_loaded
+        added = []
+        changed = []
+        for name in store.names():
+            record = store.get(name)
+            old = old_store.get(name)
+            if old is None or type(old) is not type(record) or (
+                old.controller_id,
+                getattr(old, "port", None),
+            ) != (record.controller_id, getattr(record, "port", None)):
+                added.append(name)
+                continue
+            # 엔티티가 참조하는 기존 레코드를 유지하고 상태만 갱신
+            if old.state != record.state:
+                old.copy_state(record)
+                changed.append(old)
+            old.zone_id = record.zone_id
+            store.add(old)
+        self.store = store
+        self.zones = zones
+        if first_load:
+            return 0
+
+        removed = [
+            name
+            for name in old_store.names()
+            if store.get(name) is not old_store.get(name)
+        ]
+        for name in removed:
+            async_dispatcher_send(self.hass, SIGNAL_DEVICE_REMOVED.format(name))
+        for record in changed:
+            self._async_dispatch_record(record)
+        for zone_id in {record.zone_id for record in changed}:
+            async_dispatcher_send(self.hass, SIGNAL_ZONE_UPDATE.format(zone_id))
+        added_zones = [
+            zone_id
+            for zone_id in self.request_zone_ids()
+            if zone_id not in old_zones or not old_zones[zone_id]["members"]
+        ]
+        for zone_id, zone in old_zones.items():
+            if zone["members"] and not zones.get(zone_id, {}).get("members"):
+                async_dispatcher_send(
+                    self.hass, SIGNAL_DEVICE_REMOVED.format(f"zone_{zone_id}")
+                )
+        if added or added_zones:
+            async_dispatcher_send(
+                self.hass,
+                SIGNAL_NEW_DEVICES.format(self.entry_id),
+                added,
+                added_zones,
+            )
+        self._LOGGER.debug(
+            "Topology refreshed: %s added, %s changed, %s removed",
+            len(added),
+            len(changed),
+            len(removed),
+        )
+        return len(changed)
+
+    @callback
+    def _async_dispatch_record(self, record):
+        if isinstance(record, InshowClimateState):
+            signal = SIGNAL_CLIMATE_UPDATE.format(record.controller_id)
+        else:
+            signal = SIGNAL_LIGHT_UPDATE.format(record.controller_id, record.port)
+        async_dispatcher_send(self.hass, signal)
+
+    @callback
+    def _async_drain_inbox(self):
+        """Apply every queued message, then notify each touched entity once."""
+        self._drain_scheduled = False
+        start = time.perf_counter()
+        inbox = self._inbox
+        depth = len(inbox)
+        signals = {}
+        last_message = self.last_message
+        now = time.monotonic()
+        while inbox:
+            kind, target, data = inbox.popleft()
+            if kind != ROUTE_ZONE:
+                last_message[target] = now
+            if kind == ROUTE_LIGHT:
+                self._apply_light_update(target, data, signals)
+            elif kind == ROUTE_CLIMATE:
+                self._apply_climate_update(target, data, signals)
+            else:
+                self._apply_zone_update(target, data, signals)
+            if self._awaiting or self.unconfirmed:
+                self._async_match_confirmation(kind, target, data)
+        # 같은 엔티티에 대한 여러 메시지는 레코드에 순서대로 반영되어 마지막 값만 남음
+        self._async_send_signals(signals)
+
+        stats = self.stats
+        stats["drains"] += 1
+        stats["drained_messages"] += depth
+        stats["last_drain_size"] = depth
+        stats["max_drain_size"] = max(stats["max_drain_size"], depth)
+        end = time.perf_counter()
+        stats["last_drain_ms"] = (end - start) * 1000
+        stats["max_drain_ms"] = max(stats["max_drain_ms"], stats["last_drain_ms"])
+        # 첫 메시지가 큐에 들어온 뒤 엔티티에 알리기까지 걸린 시간
+        dispatch_ms = (end - self._drain_requested_at) * 1000
+        stats["last_dispatch_ms"] = dispatch_ms
+        stats["max_dispatch_ms"] = max(stats["max_dispatch_ms"], dispatch_ms)
+        stats["total_dispatch_ms"] += dispatch_ms
+
+    @callback
+    def _async_await_confirmation(self, confirm):
+        """Start the confirmation timeout of each (key, expected) of a publish."""
+        now = time.monotonic()
+        for key, expected in confirm:
+            if (record := self._confirm_record(key)) is None:
+                continue
+            if (previous := self._awaiting.pop(key, None)) is not None:
+                previous[3].cancel()
+            timeout = self.confirm_timeout
+            if isinstance(record, InshowClimateState):
+                timeout = max(timeout, CLIMATE_CONFIRM_TIMEOUT)
+            timer = self.hass.loop.call_later(
+                timeout, self._async_confirmation_timeout, key
+            )
+            self._awaiting[key] = (expected, now, record.name, timer)
+
+    def _confirm_record(self, key):
+        if key in self.store.light_index:
+            return self.store.light_index[key]
+        return self.store.climate_index.get(key[0])
+
+    @callback
+    def _async_match_confirmation(self, kind, target, data):
+        """Match a received message against the commands awaiting confirmation."""
+        if kind == ROUTE_LIGHT:
+            payload = data.get("data", {})
+            serial = data.get("serial", target)
+            ports = [payload["port"]] if "port" in payload else payload.get("ports") or []
+            keys = [(serial, port) for port in ports]
+        elif kind == ROUTE_CLIMATE:
+            # 명령 topic은 우리가 보낸 메시지의 echo도 오므로 ROOMTEMPREAL만 확인으로 봄
+            payload = data
+            keys = [(target, "POWER_RL")] if "POWER_RL" in data else []
+        else:
+            # zone topic은 우리가 보낸 zone 명령의 echo일 뿐
+            return
+        now = time.monotonic()
+        for key in keys:
+            if (record := self._confirm_record(key)) is not None:
+                self.unconfirmed.discard(record.name)
+            if (awaiting := self._awaiting.get(key)) is None:
+                continue
+            expected, sent_at, _, timer = awaiting
+            if any(payload.get(field, value) != value for field, value in expected.items()):
+                continue
+            timer.cancel()
+            del self._awaiting[key]
+            self.stats["confirmed"] += 1
+            histogram = self.latency_histograms.setdefault(
+                key[0], [0] * (len(LATENCY_BUCKETS) + 1)
+            )
+            histogram[bisect_left(LATENCY_BUCKETS, now - sent_at)] += 1
+
+    @callback
+    def _async_confirmation_timeout(self, key):
+        """Mark the device unavailable and refetch /zones for its real state."""
+        if (awaiting := self._awaiting.pop(key, None)) is None:
+            return
+        controller_id = key[0]
+        self.stats["confirm_timeouts"] += 1
+        self.command_timeouts[controller_id] = (
+            self.command_timeouts.get(controller_id, 0) + 1
+        )
+        self._LOGGER.warning(
+            "Controller %s did not confirm a command in time", controller_id
+        )
+        self.unconfirmed.add(awaiting[2])
+        if (record := self.store.get(awaiting[2])) is not None:
+            self._async_dispatch_record(record)
+        if self._refresh_task is None:
+            self._refresh_task = self.hass.async_create_background_task(
+                self._async_refresh_unconfirmed(), "inshow_confirm_refresh"
+            )
+
+    async def _async_refresh_unconfirmed(self):
+        """Roll unconfirmed devices back to /zones, retrying with backoff until it works."""
+        try:
+            attempt = 0
+            # 성공한 get_data는 어느 경로든 unconfirmed를 비움
+            while self.unconfirmed and not self._stopping:
+                if await self.get_data(conditional=False):
+                    return
+                await asyncio.sleep(_backoff_delay(attempt))
+                attempt += 1
+        finally:
+            self._refresh_task = None
+
+    @callback
+    def _async_restore_unconfirmed(self):
+        """Mark unconfirmed devices available again after /zones gave their real state."""
+        # 서버 값과 같아 변경 signal이 없던 레코드도 available로 다시 기록
+        names, self.unconfirmed = self.unconfirmed, set()
+        for name in names:
+            if (record := self.store.get(name)) is not None:
+                self._async_dispatch_record(record)
+
+    @callback
+    def _async_send_signals(self, signals):
+        for signal in signals:
+            async_dispatcher_send(self.hass, signal)
+
+    def _apply_light_update(self, controller_id, data, signals):
+        """Apply a light message to its (serial, port) records."""
+        payload = data.get("data", {})
+        if "port" in payload:
+            ports = [payload["port"]]
+        else:
+            ports = payload.get("ports") or []
+        serial = data.get("serial", controller_id)
+        for port in ports:
+            if (record := self.store.light_index.get((serial, port))) is None:
+                continue
+            record.apply(payload)
+            signals[SIGNAL_LIGHT_UPDATE.format(serial, port)] = None
+            signals[SIGNAL_ZONE_UPDATE.format(record.zone_id)] = None
+
+    def _apply_zone_update(self, zone_id, data, signals):
+        """Apply a zone-level message to every member light in one pass."""
+        if (zone := self.zones.get(zone_id)) is None:
+            return
+        payload = data.get("data", {})
+        for name in zone["members"]:
+            record = self.store.lights[name]
+            record.apply(payload)
+            signals[SIGNAL_LIGHT_UPDATE.format(record.controller_id, record.port)] = None
+        signals[SIGNAL_ZONE_UPDATE.format(zone_id)] = None
+
+    def _apply_climate_update(self, controller_id, data, signals):
+        """Apply a climate message to its controller record."""
+        if (record := self.store.climate_index.get(controller_id)) is None:
+            return
+        record.apply(data)
+        signals[SIGNAL_CLIMATE_UPDATE.format(controller_id)] = None
+
+    @property
+    def inbox_depth(self):
+        """Return the number of received messages waiting to be applied."""
+        return len(self._inbox)
+
+    def request_zone_ids(self):
+        return [zone_id for zone_id, zone in self.zones.items() if zone["members"]]
+
+    def request_zone(self, zone_id):
+        return self.zones[zone_id]
+
+    def request_zone_members(self, zone_id):
+        return [self.store.lights[name] for name in self.zones[zone_id]["members"]]
+
     def request_data(self, name):
-        return self.data[name]
+        return self.store.get(name)
 
     def request_keys_for_light(self):
-        return [key for key in self.data.keys() if "75DFISCA" not in key]
-    
+        return list(self.store.lights)
+
     def request_keys_for_climate(self):
-        return [key for key in self.data.keys() if "75DFISCA" in key]
+        return list(self.store.climates)
+
+    def request_batches(self, names):
+        """Split names into registration batches of whole controllers."""
+        by_controller = {}
+        for name in names:
+            by_controller.setdefault(self.store.get(name).controller_id, []).append(name)
+        batches = []
+        batch = []
+        for controller_names in by_controller.values():
+            if batch and len(batch) + len(controller_names) > ENTITY_BATCH_SIZE:
+                batches.append(batch)
+                batch = []
+            batch.extend(controller_names)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def request_device_info(self, record, model):
+        """Return the device of a record's controller, placed in its zone's area."""
+        zone = self.zones.get(record.zone_id)
+        return {
+            "identifiers": {(DOMAIN, record.controller_id)},
+            "name": f"Inshow {record.controller_id}",
+            "manufacturer": "Inshow",
+            "model": model,
+            "sw_version": "1.0",
+            "suggested_area": zone["name"] if zone else None,
+        }
 
     def mqtt_subscribe(self, topic):
-        # self.client.subscribe(topic)
-        self.client.subscribe(topic)
+        self.mqtt_subscribe_many([topic])
+
+    def mqtt_subscribe_many(self, topics):
+        """Subscribe to several topics with as few SUBSCRIBE packets as possible."""
+        if self.connection is None:
+            return
+        # entry당 topic 하나에 참조 하나만 잡음
+        topics = [topic for topic in dict.fromkeys(topics) if topic not in self._subscribed]
+        self.connection.subscribe(topics)
+        self._subscribed.update(topics)
 
-    def mqtt_msg(self, topic, msg):
+    def mqtt_msg(self, topic, msg, qos=0):
         """Publish an MQTT message."""
-        self._LOGGER.debug(f"MQTT MSG: {msg}")
-        self.client.publish(topic=topic, payload=msg)
+        self._LOGGER.debug("Publishing %s on topic %s", msg, topic)
+        if self.connection is None:
+            self._LOGGER.warning("MQTT client is not connected yet")
+            return None
+        if self.recorder is not None:
+            self.recorder.record(DIRECTION_OUT, topic, msg)
+        info = self.connection.publish(topic, msg, qos)
+        self.stats["publishes"] += 1
+        if info is None or info.rc != mqtt.MQTT_ERR_SUCCESS:
+            self.stats["publish_failures"] += 1
+        return info
+
+    def metrics(self):
+        """Return a snapshot of the performance counters for diagnostics."""
+        connection = self.connection
+        now = time.monotonic()
+        return {
+            "transport": self.transport,
+            "mode": self.mode,
+            "connected": connection is not None and connection.connected,
+            "seconds_since_last_message": {
+                controller_id: round(now - at, 1)
+                for controller_id, at in self.last_message.items()
+            },
+            "unrouted_messages": (
+                connection.unrouted_messages if connection is not None else 0
+            ),
+            "devices": {
+                "lights": len(self.store.lights),
+                "climates": len(self.store.climates),
+                "zones": len(self.request_zone_ids()),
+            },
+            "messages": dict(self.message_counts),
+            "stats": dict(self.stats),
+            "inbox_depth": self.inbox_depth,
+            "inflight": len(self._inflight),
+            "command_backlog": len(self._command_backlog),
+            "awaiting_confirmation": len(self._awaiting),
+            "unconfirmed": len(self.unconfirmed),
+            "latency_buckets": list(LATENCY_BUCKETS),
+            "latency_histograms": {
+                controller_id: list(histogram)
+                for controller_id, histogram in self.latency_histograms.items()
+            },
+            "command_timeouts": dict(self.command_timeouts),
+            "recorded_messages": (
+                self.recorder.records if self.recorder is not None else None
+            ),
+            "recent_traffic": (
+                self.recorder.recent_as_list() if self.recorder is not None else []
+            ),
+        }
+
+    @callback
+    def async_schedule_command(self, key, topic, msg, confirm=None):
+        """Publish a command, keeping only the latest one per key within the window.
+
+        confirm lists the (key, expected payload fields) the controller should report.
+        """
+        self._pending_commands[key] = (topic, msg, confirm)
+        if key not in self._command_timers:
+            self._command_timers[key] = self.hass.loop.call_later(
+                self.command_window, self._async_flush_command, key
+            )
+
+    @callback
+    def async_schedule_light_command(self, controller_id, port, onoff, bright, color):
+        """Queue a light command; same-state ports of one controller share a publish."""
+        self._light_commands.setdefault(controller_id, {})[port] = (
+            onoff,
+            bright,
+            color,
+        )
+        # 낙관적으로 바뀐 멤버 상태를 zone 엔티티에도 반영
+        if (record := self.store.light_index.get((controller_id, port))) is not None:
+            async_dispatcher_send(self.hass, SIGNAL_ZONE_UPDATE.format(record.zone_id))
+        if controller_id not in self._light_timers:
+            self._light_timers[controller_id] = self.hass.loop.call_later(
+                self.command_window, self._async_flush_light_commands, controller_id
+            )
+
+    @callback
+    def _async_flush_light_commands(self, controller_id):
+        self._light_timers.pop(controller_id, None)
+        commands = self._light_commands.pop(controller_id, None)
+        if not commands:
+            return
+        groups = {}
+        for port, state in commands.items():
+            groups.setdefault(state, []).append(port)
+        topic = f"$MTZ/inshow/mcs/{controller_id}/state/control"
+        for (onoff, bright, color), ports in groups.items():
+            ports = sorted(port for port in ports if port)
+            payload = {
+                "cmd": "c",
+                "serial": controller_id,
+                "type": 1,
+                "data": {
+                    "ports": ports,
+                    "onoff": onoff,
+                    "bright": bright,
+                    "color": color,
+                },
+            }
+            expected = {"onoff": onoff}
+            if onoff:
+                expected.update(bright=bright, color=color)
+            self._async_submit_command(
+                (controller_id, tuple(ports)),
+                (
+                    topic,
+                    json.dumps(payload),
+                    [((controller_id, port), expected) for port in ports],
+                ),
+            )
+
+    @callback
+    def async_schedule_zone_command(self, zone_id, onoff, bright, color):
+        """Control every light of a zone with one publish on the zone topic."""
+        payload = {
+            "cmd": "c",
+            "type": 1,
+            "data": {"onoff": onoff, "bright": bright, "color": color},
+        }
+        expected = {"onoff": onoff}
+        if onoff:
+            expected.update(bright=bright, color=color)
+        # 확인은 각 멤버 controller의 state/changed로 받음
+        self.async_schedule_command(
+            ("zone", zone_id),
+            f"$MTZ/inshow/zone/{zone_id}/state/control",
+            json.dumps(payload),
+            [
+                ((record.controller_id, record.port), expected)
+                for record in self.request_zone_members(zone_id)
+            ],
+        )
+        # 멤버 조명에 낙관적으로 바로 반영 (브로커 echo도 같은 경로로 처리됨)
+        signals = {}
+        self._apply_zone_update(zone_id, payload, signals)
+        self._async_send_signals(signals)
+
+    @callback
+    def _async_flush_command(self, key):
+        self._command_timers.pop(key, None)
+        if (command := self._pending_commands.pop(key, None)) is None:
+            return
+        self._async_submit_command(key, command)
+
+    @callback
+    def _async_submit_command(self, key, command):
+        # 조명 명령은 같은 port를 다루는 이전 대기 명령에서 그 port를 뺌
+        if isinstance(key[1], tuple):
+            self._async_trim_light_backlog(key[0], set(key[1]))
+        # 먼저 들어온 명령이 나중에 발행되지 않도록 항상 backlog 뒤에 줄을 세우고
+        # in-flight window가 허용하는 만큼 앞에서부터 발행
+        self._command_backlog.pop(key, None)
+        self._command_backlog[key] = command
+        self._async_drain_backlog()
+
+    @callback
+    def _async_trim_light_backlog(self, controller_id, ports):
+        """Remove ports from older queued light commands of the same controller."""
+        if not any(
+            key[0] == controller_id
+            and isinstance(key[1], tuple)
+            and not ports.isdisjoint(key[1])
+            for key in self._command_backlog
+        ):
+            return
+        # 순서를 유지한 채 다시 구성
+        backlog = OrderedDict()
+        for key, (topic, msg, confirm) in self._command_backlog.items():
+            if (
+                key[0] != controller_id
+                or not isinstance(key[1], tuple)
+                or ports.isdisjoint(key[1])
+            ):
+                backlog[key] = (topic, msg, confirm)
+                continue
+            remaining = [port for port in key[1] if port not in ports]
+            if not remaining:
+                continue
+            payload = json.loads(msg)
+            payload["data"]["ports"] = remaining
+            confirm = [item for item in confirm or [] if item[0][1] not in ports]
+            backlog[(controller_id, tuple(remaining))] = (
+                topic,
+                json.dumps(payload),
+                confirm,
+            )
+        self._command_backlog = backlog
+
+    @callback
+    def _async_publish_command(self, topic, msg, confirm=None):
+        # QoS 1이라 on_publish는 broker의 PUBACK을 받은 뒤에 호출됨
+        info = self.mqtt_msg(topic, msg, qos=1)
+        if info is not None and info.rc == mqtt.MQTT_ERR_SUCCESS:
+            self._inflight.add(info.mid)
+        # 발행에 실패해도 낙관적으로 바꾼 상태는 timeout 후 /zones 값으로 되돌림
+        if confirm and self.confirm_timeout:
+            self._async_await_confirmation(confirm)
+
+    @callback
+    def _async_on_publish(self, mid):
+        # 공유 연결이라 다른 entry의 mid도 전달됨
+        if mid not in self._inflight:
+            return
+        self._inflight.discard(mid)
+        self._async_drain_backlog()
+
+    @callback
+    def _async_drain_backlog(self):
+        while self._command_backlog and len(self._inflight) < self.max_inflight:
+            _, command = self._command_backlog.popitem(last=False)
+            self._async_publish_command(*command)
+
+    @callback
+    def _async_reset_inflight(self):
+        # 연결이 끊기면 ack가 오지 않으므로 window를 비워 backlog가 막히지 않게 함
+        self._inflight.clear()
@@ -1,9 +1,17 @@
 from homeassistant.components.climate import ClimateEntity, HVACMode, ClimateEntityFeature
 from homeassistant.const import UnitOfTemperature
+from homeassistant.core import callback
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
-from . import DOMAIN
 import logging
 import json
+import time
+
+from .const import (
+    SIGNAL_CLIMATE_UPDATE,
+    SIGNAL_DEVICE_REMOVED,
+    SIGNAL_NEW_DEVICES,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -13,40 +21,50 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     # config_entry.runtime_data에 저장된 InshowApi 객체를 가져옴
     api = config_entry.runtime_data
 
-    # api에서 모든 엔티티 키를 가져옴 (request_keys 메서드를 사용)
-    keys = api.request_keys_for_climate()
-
-    # 엔티티 목록을 만들어서 추가
-    climates = [InshowClimate(api, key) for key in keys]
-
-    # Home Assistant에 엔티티 추가
-    async_add_entities(climates)
+    # controller 단위 batch로 나눠 추가해 registry 기록을 작게 유지
+    for batch in api.request_batches(api.request_keys_for_climate()):
+        async_add_entities([InshowClimate(api, key) for key in batch])
+
+    @callback
+    def _async_add_new_devices(names, zone_ids):
+        """Add entities for devices found by a background topology refresh."""
+        names = [name for name in names if name in api.store.climates]
+        for batch in api.request_batches(names):
+            async_add_entities([InshowClimate(api, name) for name in batch])
+
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_NEW_DEVICES.format(config_entry.entry_id),
+            _async_add_new_devices,
+        )
+    )
 
 class InshowClimate(ClimateEntity):
     def __init__(self, api, name):
         # API 데이터에서 초기 상태와 밝기 정보를 설정        
         self._api = api
         self._name = name
-        self._data = api.request_data(name)
-        self._cId = self._data.get("controllerId")
-        self._pri_name = self._data.get("pri_name")
-        self._id = self._data.get("id")
-        self._current_temp = float(self._data.get("item").get("currentTemp"))
-        self._target_temp = float(self._data.get("item").get("targetTemp"))
-        self._onoff = self._data.get("item").get("onoff") == 1
-        self._pattern = self._data.get("item").get("pattern")
+        # 상태는 api의 state store 레코드를 그대로 참조 (엔티티는 얇은 view)
+        self._record = api.request_data(name)
+        self._cId = self._record.controller_id
 
     @property
     def name(self):
         return self._name
 
+    @property
+    def available(self):
+        """Return False while a command is left unconfirmed by the controller."""
+        return self._name not in self._api.unconfirmed
+
     @property
     def current_temperature(self):
-        return self._current_temp
+        return self._record.current_temp
 
     @property
     def target_temperature(self):
-        return self._target_temp
+        return self._record.target_temp
     
     @property
     def temperature_unit(self):
@@ -54,7 +72,7 @@ class InshowClimate(ClimateEntity):
     
     @property
     def hvac_mode(self):
-        return HVACMode.HEAT if self._onoff else HVACMode.OFF
+        return HVACMode.HEAT if self._record.onoff else HVACMode.OFF
     
     @property
     def hvac_modes(self):
@@ -66,7 +84,7 @@ class InshowClimate(ClimateEntity):
     
     @property
     def preset_mode(self):
-        return self._pattern
+        return self._record.pattern
     
     @property
     def min_temp(self):
@@ -80,46 +98,67 @@ class InshowClimate(ClimateEntity):
     async def async_set_hvac_mode(self, hvac_mode):
         """Set new target hvac mode."""
         if hvac_mode == HVACMode.HEAT:
-            self._onoff = True
+            self._record.onoff = True
         elif hvac_mode == HVACMode.OFF:
-            self._onoff = False
+            self._record.onoff = False
         await self._update_state("AwayModeSet")
 
     async def async_turn_on(self, **kwargs):
         """Turn the climate on."""
-        self._onoff = True
+        self._record.onoff = True
 
         # 온도 값이 전달되었는지 확인하고 처리
         if "TempTargetSet" in kwargs:            
-            self._target_temp = float(kwargs["TempTargetSet"])
+            self._record.target_temp = float(kwargs["TempTargetSet"])
 
         if "PatternModeSet" in kwargs:
-            self._pattern = kwargs["PatternModeSet"]
+            self._record.pattern = str(kwargs["PatternModeSet"])
 
         await self._update_state("AwayModeSet")
 
     async def async_turn_off(self, **kwargs):
         """Turn the climate off."""
-        self._onoff = False
+        self._record.onoff = False
 
         await self._update_state("AwayModeSet")
 
     async def async_set_temperature(self, **kwargs):
         """Set new target temperature."""
         if "temperature" in kwargs:
-            self._target_temp = float(kwargs["temperature"])
+            self._record.target_temp = float(kwargs["temperature"])
             await self._update_state("TempTargetSet")
 
     async def async_set_preset_mode(self, preset_mode):
         """Set new preset mode."""
-        self._pattern = preset_mode
+        self._record.pattern = preset_mode
         await self._update_state("PatternModeSet")
 
     async def _update_state(self, command):
         """Update the state and send an MQTT message."""
         await self._send_mqtt_message(command)
+        self._async_write_state()
+
+    @callback
+    def _async_write_state(self):
+        self._written_state = self._record.state
+        self._written_available = self.available
+        self._written_at = time.monotonic()
+        self._api.stats["state_writes"] += 1
         self.async_write_ha_state()
 
+    def _is_redundant_update(self):
+        """Return True if only current_temperature moved, and not enough."""
+        state = self._record.state
+        written = self._written_state
+        if state[1:] != written[1:] or self.available != self._written_available:
+            return False
+        delta = abs(state[0] - written[0])
+        return (
+            delta == 0
+            or delta < self._api.temp_hysteresis
+            or time.monotonic() - self._written_at < self._api.temp_min_interval
+        )
+
     async def _send_mqtt_message(self, command):
         """Helper function to send an MQTT message."""
         if self._api is None:
@@ -128,26 +167,30 @@ class InshowClimate(ClimateEntity):
         command_line = {"AwayModeSet": "AWAYMODESET", 
                         "TempTargetSet": "TEMPTARGETSET", 
                         "PatternModeSet": "PATTERNMODESET"}
+        confirm = None
         if "AwayModeSet" == command:
-            payload = {command: 0 if self._onoff else 1}
+            payload = {command: 0 if self._record.onoff else 1}
+            # 전원 변경은 ROOMTEMPREAL의 POWER_RL로 확인
+            confirm = [
+                (
+                    (self._cId, "POWER_RL"),
+                    {"POWER_RL": "ON" if self._record.onoff else "OFF"},
+                )
+            ]
         elif "TempTargetSet" == command:
-            payload = {command: self._target_temp}
+            payload = {command: self._record.target_temp}
         elif "PatternModeSet" == command:
-            payload = {command: int(self._pattern)}
+            payload = {command: int(self._record.pattern)}
         topic = f"stat/inshow/{self._cId}/{command_line[command]}"
-        # MQTT 메시지 발행
-        self._api.mqtt_msg(topic, json.dumps(payload))
+        # MQTT 메시지 발행 (슬라이더 연속 입력은 api에서 마지막 값만 발행)
+        self._api.async_schedule_command(
+            (self._cId, command), topic, json.dumps(payload), confirm
+        )
 
     @property
     def device_info(self):
-        """Return device information for this entity."""
-        return {
-            "identifiers": {(DOMAIN, "IOT")},  # 고유 장치 식별자
-            "name": "Inshow",  # 장치 이름
-            "manufacturer": "Inshow",  # 제조사 이름
-            "model": "Inshow Climate Model",  # 모델 이름
-            "sw_version": "1.0",  # 소프트웨어 버전
-        }
+        """Return the device of this thermostat's controller."""
+        return self._api.request_device_info(self._record, "Inshow Climate Model")
 
     @property
     def unique_id(self):
@@ -155,32 +198,38 @@ class InshowClimate(ClimateEntity):
         return f"{self._name}_{self._cId}"
 
     async def async_added_to_hass(self):
+        self._written_state = self._record.state
+        self._written_available = self.available
+        self._written_at = time.monotonic()
         self._unsub_dispatcher = async_dispatcher_connect(
-            self.hass, "inshow_climate_update", self._handle_climate_update
+            self.hass,
+            SIGNAL_CLIMATE_UPDATE.format(self._cId),
+            self._handle_climate_update,
+        )
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_DEVICE_REMOVED.format(self._name),
+                self._async_handle_removed,
+            )
         )
 
-    async def _handle_climate_update(self, event_data):
-        """Handle the incoming MQTT message and update the climate entity."""
-
-        # MQTT 메시지에서 port 정보를 처리
-        # Received message '{'Temperature': 25.5, 'POWER_RL': 'OFF'}' on topic 'stat/inshow/75DFISCA6310/ROOMTEMPREAL'
-        # Received message '{'AwayModeSet': 0}' on topic 'stat/inshow/75DFISCA602E/AWAYMODESET'
-        # Received message '{'TempTargetSet': 23.0}' on topic 'stat/inshow/75DFISCA602E/TEMPTARGETSET'
-        # Received message '{'PatternModeSet': 1}' on topic 'stat/inshow/75DFISCA602E/PATTERNMODESET'
-        if event_data.get("controllerId") == self._cId:
-            if 'Temperature' in event_data:
-                self._current_temp = float(event_data.get("Temperature", self._current_temp))
-                self._onoff = event_data.get("POWER_RL", "OFF") == "ON"
-            if 'AwayModeSet' in event_data:
-                self._onoff = event_data.get("AwayModeSet", 0) == 0
-            if 'TempTargetSet' in event_data:
-                self._target_temp = float(event_data.get("TempTargetSet", self._target_temp))
-            if 'PatternModeSet' in event_data:
-                self._pattern = event_data.get("PatternModeSet", self._pattern)     
-            # 상태 변경 알림
-            self.async_write_ha_state()
+    async def _async_handle_removed(self):
+        """Remove the entity when its device is gone from /zones."""
+        if self.registry_entry is not None:
+            er.async_get(self.hass).async_remove(self.entity_id)
         else:
+            await self.async_remove(force_remove=True)
+
+    @callback
+    def _handle_climate_update(self):
+        """Write the state after api applied an update to this controller's record."""
+
+        # api에서 controllerId 별로 레코드를 갱신한 뒤 이 엔티티에만 알림
+        if self._is_redundant_update():
+            self._api.stats["state_writes_suppressed"] += 1
             return
+        self._async_write_state()
 
     async def async_will_remove_from_hass(self):
         # Dispatcher unsubscribe
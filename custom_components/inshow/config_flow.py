@@ -1,9 +1,33 @@
 import voluptuous as vol
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .const import DOMAIN  # DOMAIN은 통합의 도메인 이름
+from .const import (  # DOMAIN은 통합의 도메인 이름
+    CONF_COMMAND_WINDOW,
+    CONF_CONFIRM_TIMEOUT,
+    CONF_KEEP_CONNECTION,
+    CONF_MAX_INFLIGHT,
+    CONF_POLL_INTERVAL,
+    CONF_RECONCILE_INTERVAL,
+    CONF_RECORD_TRAFFIC,
+    CONF_TEMP_HYSTERESIS,
+    CONF_TEMP_MIN_INTERVAL,
+    CONF_TRANSPORT,
+    DEFAULT_COMMAND_WINDOW,
+    DEFAULT_CONFIRM_TIMEOUT,
+    DEFAULT_KEEP_CONNECTION,
+    DEFAULT_MAX_INFLIGHT,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_RECONCILE_INTERVAL,
+    DEFAULT_RECORD_TRAFFIC,
+    DEFAULT_TEMP_HYSTERESIS,
+    DEFAULT_TEMP_MIN_INTERVAL,
+    DEFAULT_TRANSPORT,
+    DOMAIN,
+    TRANSPORT_EVENT_LOOP,
+    TRANSPORT_THREAD,
+)
 
 # 사용자에게 입력받을 필드 정의
 STEP_USER_DATA_SCHEMA = vol.Schema(
@@ -19,6 +43,12 @@ class InshowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow for this handler."""
+        return InshowOptionsFlow()
+
     async def async_step_user(self, user_input=None) -> FlowResult:
         """Handle the initial step where the user inputs their data."""
 
@@ -29,3 +59,60 @@ class InshowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             return self.async_create_entry(title="Inshow IOT", data=user_input)
 
         return self.async_show_form(step_id="user", data_schema=STEP_USER_DATA_SCHEMA)
+
+
+class InshowOptionsFlow(config_entries.OptionsFlow):
+    """Handle Inshow IOT options."""
+
+    async def async_step_init(self, user_input=None) -> FlowResult:
+        """Manage the integration options."""
+
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        schema = vol.Schema(
+            {
+                vol.Optional(
+                    CONF_TRANSPORT,
+                    default=options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT),
+                ): vol.In([TRANSPORT_THREAD, TRANSPORT_EVENT_LOOP]),
+                vol.Optional(
+                    CONF_COMMAND_WINDOW,
+                    default=options.get(CONF_COMMAND_WINDOW, DEFAULT_COMMAND_WINDOW),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=2000)),
+                vol.Optional(
+                    CONF_MAX_INFLIGHT,
+                    default=options.get(CONF_MAX_INFLIGHT, DEFAULT_MAX_INFLIGHT),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+                vol.Optional(
+                    CONF_TEMP_HYSTERESIS,
+                    default=options.get(CONF_TEMP_HYSTERESIS, DEFAULT_TEMP_HYSTERESIS),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=5)),
+                vol.Optional(
+                    CONF_TEMP_MIN_INTERVAL,
+                    default=options.get(CONF_TEMP_MIN_INTERVAL, DEFAULT_TEMP_MIN_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                vol.Optional(
+                    CONF_KEEP_CONNECTION,
+                    default=options.get(CONF_KEEP_CONNECTION, DEFAULT_KEEP_CONNECTION),
+                ): bool,
+                vol.Optional(
+                    CONF_RECONCILE_INTERVAL,
+                    default=options.get(CONF_RECONCILE_INTERVAL, DEFAULT_RECONCILE_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1440)),
+                vol.Optional(
+                    CONF_CONFIRM_TIMEOUT,
+                    default=options.get(CONF_CONFIRM_TIMEOUT, DEFAULT_CONFIRM_TIMEOUT),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=300)),
+                vol.Optional(
+                    CONF_POLL_INTERVAL,
+                    default=options.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=10, max=3600)),
+                vol.Optional(
+                    CONF_RECORD_TRAFFIC,
+                    default=options.get(CONF_RECORD_TRAFFIC, DEFAULT_RECORD_TRAFFIC),
+                ): bool,
+            }
+        )
+        return self.async_show_form(step_id="init", data_schema=schema)
@@ -1,3 +1,54 @@
 """Constants for the hello integration."""
 
 DOMAIN = "inshow"
+
+# 장치별 dispatcher signal (controllerId, port)
+SIGNAL_LIGHT_UPDATE = "inshow_light_update_{}_{}"
+SIGNAL_CLIMATE_UPDATE = "inshow_climate_update_{}"
+SIGNAL_ZONE_UPDATE = "inshow_zone_update_{}"
+
+# topology 변경 signal (entry_id) / (엔티티 key)
+SIGNAL_NEW_DEVICES = "inshow_new_devices_{}"
+SIGNAL_DEVICE_REMOVED = "inshow_device_removed_{}"
+
+# MQTT transport 선택
+CONF_TRANSPORT = "transport"
+TRANSPORT_THREAD = "thread"
+TRANSPORT_EVENT_LOOP = "event_loop"
+DEFAULT_TRANSPORT = TRANSPORT_THREAD
+
+# 명령 coalescing window (ms) 및 in-flight publish 상한
+CONF_COMMAND_WINDOW = "command_window"
+DEFAULT_COMMAND_WINDOW = 150
+CONF_MAX_INFLIGHT = "max_inflight"
+DEFAULT_MAX_INFLIGHT = 10
+
+# 현재 온도 상태 기록 조건 (변화량 °C, 최소 간격 초)
+CONF_TEMP_HYSTERESIS = "temperature_hysteresis"
+DEFAULT_TEMP_HYSTERESIS = 0.0
+CONF_TEMP_MIN_INTERVAL = "temperature_min_interval"
+DEFAULT_TEMP_MIN_INTERVAL = 0
+
+# 옵션만 바뀐 reload에서 MQTT 연결과 topology를 유지
+CONF_KEEP_CONNECTION = "keep_connection"
+DEFAULT_KEEP_CONNECTION = True
+
+# /zones 재조회로 MQTT 누락 상태를 보정하는 주기 (분, 0이면 끔)
+CONF_RECONCILE_INTERVAL = "reconcile_interval"
+DEFAULT_RECONCILE_INTERVAL = 15
+
+# 명령 확인(state/changed) 대기 시간 (초, 0이면 추적 안 함)
+CONF_CONFIRM_TIMEOUT = "confirm_timeout"
+DEFAULT_CONFIRM_TIMEOUT = 10
+
+# raw MQTT 트래픽을 파일로 기록 (replay/부하 테스트용)
+CONF_RECORD_TRAFFIC = "record_traffic"
+DEFAULT_RECORD_TRAFFIC = False
+
+# MQTT를 쓸 수 없을 때 /zones polling 간격 (초)
+CONF_POLL_INTERVAL = "poll_interval"
+DEFAULT_POLL_INTERVAL = 60
+
+# 상태 수신 방식
+MODE_PUSH = "push"
+MODE_POLLING = "polling"
@@ -0,0 +1,22 @@
+"""Diagnostics support for Inshow."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.core import HomeAssistant
+
+from . import InshowConfigEntry
+
+TO_REDACT = {"E-mail", "password", "unique_id", "title"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: InshowConfigEntry
+) -> dict[str, Any]:
+    """Return the performance counters of a config entry."""
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "metrics": entry.runtime_data.metrics(),
+    }
@@ -2,13 +2,35 @@ from homeassistant.components.light import LightEntity, ColorMode
 from . import DOMAIN
 import logging
 from homeassistant.util.color import value_to_brightness
+from homeassistant.core import callback
+from homeassistant.helpers import (
+    config_validation as cv,
+    entity_platform,
+    entity_registry as er,
+)
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
-import json
+import voluptuous as vol
+
+from .const import (
+    SIGNAL_DEVICE_REMOVED,
+    SIGNAL_LIGHT_UPDATE,
+    SIGNAL_NEW_DEVICES,
+    SIGNAL_ZONE_UPDATE,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 BRIGHTNESS_SCALE = (0, 100)
 
+SERVICE_SET_LIGHTS = "set_lights"
+SET_LIGHTS_SCHEMA = {
+    vol.Required("onoff"): cv.boolean,
+    vol.Optional("brightness"): vol.All(vol.Coerce(int), vol.Range(min=0, max=255)),
+    vol.Optional("color_temp_kelvin"): vol.All(
+        vol.Coerce(int), vol.Range(min=3500, max=5500)
+    ),
+}
+
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up Inshow light entities from config entry."""
@@ -16,29 +38,48 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     # config_entry.runtime_data에 저장된 InshowApi 객체를 가져옴
     api = config_entry.runtime_data
 
-    # api에서 모든 엔티티 키를 가져옴 (request_keys 메서드를 사용)
-    keys = api.request_keys_for_light()
-
-    # 엔티티 목록을 만들어서 추가
-    lights = [InshowLight(api, key) for key in keys]
+    # controller 단위 batch로 나눠 추가해 registry 기록을 작게 유지
+    for batch in api.request_batches(api.request_keys_for_light()):
+        async_add_entities([InshowLight(api, key) for key in batch])
+
+    # 구역 전체를 한 번의 publish로 제어하는 zone 엔티티
+    zone_lights = [InshowZoneLight(api, zone_id) for zone_id in api.request_zone_ids()]
+    if zone_lights:
+        async_add_entities(zone_lights)
+
+    @callback
+    def _async_add_new_devices(names, zone_ids):
+        """Add entities for devices found by a background topology refresh."""
+        names = [name for name in names if name in api.store.lights]
+        for batch in api.request_batches(names):
+            async_add_entities([InshowLight(api, name) for name in batch])
+        if zone_ids:
+            async_add_entities([InshowZoneLight(api, zone_id) for zone_id in zone_ids])
+
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_NEW_DEVICES.format(config_entry.entry_id),
+            _async_add_new_devices,
+        )
+    )
 
-    # Home Assistant에 엔티티 추가
-    async_add_entities(lights)
+    # 여러 조명을 한 번에 제어하는 서비스 (같은 controller는 하나의 메시지로 발행)
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_SET_LIGHTS, SET_LIGHTS_SCHEMA, "async_set_light"
+    )
 
 
 class InshowLight(LightEntity):
     def __init__(self, api, name):
         # API 데이터에서 초기 상태와 밝기 정보를 설정
+        # 상태는 api의 state store 레코드를 그대로 참조 (엔티티는 얇은 view)
         self._api = api
         self._name = name
-        self._data = api.request_data(name)
-        self._cId = self._data.get("controllerId")
-        self._pri_name = self._data.get("pri_name")
-        self._id = self._data.get("id")
-        self._port = self._data.get("item").get("ports")[0]
-        self._bright = self._data.get("item").get("bright")
-        self._color = self._data.get("item").get("color")
-        self._state = self._data.get("item").get("onoff") == 1
+        self._record = api.request_data(name)
+        self._cId = self._record.controller_id
+        self._port = self._record.port
         self._color_mode = ColorMode.COLOR_TEMP
         self.should_poll = False
         self._max_color_temp_kelvin = 5500
@@ -50,71 +91,89 @@ class InshowLight(LightEntity):
 
     @property
     def is_on(self):
-        return self._state
+        return self._record.onoff == 1
+
+    @property
+    def available(self):
+        """Return False while a command is left unconfirmed by the controller."""
+        return self._name not in self._api.unconfirmed
 
     async def async_turn_on(self, **kwargs):
         """Turn the light on."""
-        self._state = True
+        self._record.onoff = 1
 
         # 밝기 값이 전달되었는지 확인하고 처리
         if "brightness" in kwargs:
             # 0~255 범위의 값을 0~100으로 변환
             brightness_ha = kwargs["brightness"]
-            self._bright = int((brightness_ha / 255) * 100)
+            self._record.bright = int((brightness_ha / 255) * 100)
 
         # 색 온도 값이 전달되었는지 확인하고 처리
         if "color_temp_kelvin" in kwargs:
             color_temp = kwargs["color_temp_kelvin"]
             # 3500K ~ 5500K를 0~20 값으로 변환
-            self._color = int(((color_temp - 3500) / 2000) * 20)
+            self._record.color = int(((color_temp - 3500) / 2000) * 20)
 
         await self._update_state()
 
     async def async_turn_off(self, **kwargs):
         """Turn the light off."""
-        self._state = False
+        self._record.onoff = 0
 
         await self._update_state()
 
     async def _update_state(self):
         """Update the state and send an MQTT message."""
         await self._send_mqtt_message()
+        self._async_write_state()
+
+    @callback
+    def _async_write_state(self):
+        self._written_state = self._record.state
+        self._written_available = self.available
+        self._api.stats["state_writes"] += 1
         self.async_write_ha_state()
 
     def scale_bright(self):
-        return int(self._bright // 10) * 10
+        return int(self._record.bright // 10) * 10
 
     def scale_color(self):
-        return int(self._color // 2) * 2
+        return int(self._record.color // 2) * 2
 
     async def _send_mqtt_message(self):
         """Helper function to send an MQTT message."""
         if self._api is None:
             _LOGGER.error("API is not initialized")
             return
-        payload = {
-            "cmd": "c",
-            "serial": self._cId,
-            "type": 1,
-            "data": {
-                "ports": [self._port] if self._port else [],
-                "onoff": 1 if self._state else 0,
-                "bright": self.scale_bright(),
-                "color": self.scale_color(),
-            },
-        }
-        topic = f"$MTZ/inshow/mcs/{self._cId}/state/control"
-        # MQTT 메시지 발행
-        self._api.mqtt_msg(topic, json.dumps(payload))
+        # MQTT 메시지 발행 (같은 controller의 동시 명령은 api에서 하나의 payload로 묶음)
+        self._api.async_schedule_light_command(
+            self._cId,
+            self._port,
+            self._record.onoff,
+            self.scale_bright(),
+            self.scale_color(),
+        )
+
+    async def async_set_light(self, onoff, brightness=None, color_temp_kelvin=None):
+        """Handle the inshow.set_lights service for this light."""
+        kwargs = {}
+        if brightness is not None:
+            kwargs["brightness"] = brightness
+        if color_temp_kelvin is not None:
+            kwargs["color_temp_kelvin"] = color_temp_kelvin
+        if onoff:
+            await self.async_turn_on(**kwargs)
+        else:
+            await self.async_turn_off()
 
     @property
     def brightness(self):
         """Return the current brightness."""
-        return value_to_brightness(BRIGHTNESS_SCALE, self._bright)
+        return value_to_brightness(BRIGHTNESS_SCALE, self._record.bright)
 
     @property
     def color_temp_kelvin(self):
-        return int((self._color / 20) * 2000 + 3500)
+        return int((self._record.color / 20) * 2000 + 3500)
 
     @property
     def supported_color_modes(self):
@@ -136,14 +195,8 @@ class InshowLight(LightEntity):
 
     @property
     def device_info(self):
-        """Return device information for this entity."""
-        return {
-            "identifiers": {(DOMAIN, "IOT")},  # 고유 장치 식별자
-            "name": "Inshow",  # 장치 이름
-            "manufacturer": "Inshow",  # 제조사 이름
-            "model": "Inshow Light Model",  # 모델 이름
-            "sw_version": "1.0",  # 소프트웨어 버전
-        }
+        """Return the device of this light's controller."""
+        return self._api.request_device_info(self._record, "Inshow Light Model")
 
     @property
     def unique_id(self):
@@ -151,31 +204,190 @@ class InshowLight(LightEntity):
         return f"{self._name}_{self._cId}_{self._port}"
 
     async def async_added_to_hass(self):
+        self._written_state = self._record.state
+        self._written_available = self.available
         self._unsub_dispatcher = async_dispatcher_connect(
-            self.hass, "inshow_light_update", self._handle_light_update
+            self.hass,
+            SIGNAL_LIGHT_UPDATE.format(self._cId, self._port),
+            self._handle_light_update,
         )
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_DEVICE_REMOVED.format(self._name),
+                self._async_handle_removed,
+            )
+        )
+
+    async def _async_handle_removed(self):
+        """Remove the entity when its device is gone from /zones."""
+        if self.registry_entry is not None:
+            er.async_get(self.hass).async_remove(self.entity_id)
+        else:
+            await self.async_remove(force_remove=True)
+
+    @callback
+    def _handle_light_update(self):
+        """Write the state after api applied an update to this light's record."""
+
+        # api에서 (serial, port) 별로 레코드를 갱신한 뒤 이 엔티티에만 알림
+        # 낙관적으로 이미 반영한 명령의 echo 등 바뀐 것이 없으면 기록하지 않음
+        if (
+            self._record.state == self._written_state
+            and self.available == self._written_available
+        ):
+            self._api.stats["state_writes_suppressed"] += 1
+            return
+        self._async_write_state()
+
+    async def async_will_remove_from_hass(self):
+        # Dispatcher unsubscribe
+        if self._unsub_dispatcher is not None:
+            self._unsub_dispatcher()
+
+
+class InshowZoneLight(LightEntity):
+    """Control every light of a zone through the zone control topic."""
+
+    def __init__(self, api, zone_id):
+        self._api = api
+        self._zone_id = zone_id
+        zone = api.request_zone(zone_id)
+        self._name = f"{zone['name']}_zone"
+        self._unsub_dispatcher = None
+        self.should_poll = False
+
+    def _reference(self):
+        """Return the member light whose state the zone reports."""
+        # 멤버 조명 중 켜진 조명이 있으면 그 조명의 밝기/색온도를 사용
+        members = self._api.request_zone_members(self._zone_id)
+        return next((m for m in members if m.onoff == 1), members[0])
+
+    @property
+    def name(self):
+        return self._name
 
-    async def _handle_light_update(self, event_data):
-        """Handle the incoming MQTT message and update the light entity."""
+    @property
+    def unique_id(self):
+        """Return a unique ID for this zone."""
+        return f"zone_{self._zone_id}"
 
-        # MQTT 메시지에서 port 정보를 처리
-        data = event_data.get("data", {})
-        ports = data.get("ports", [])
-        port = data.get("port", ports[0] if ports else None)
+    @property
+    def is_on(self):
+        return self._reference().onoff == 1
 
-        # 조건: serial이 일치하고 port가 일치하는 경우에만 상태 변경
-        if event_data.get("serial") == self._cId and port == self._port:
-            # 상태 업데이트
-            self._state = data.get("onoff", self._state) == 1
-            self._bright = data.get("bright", self._bright)
-            self._color = data.get("color", self._color)
+    @property
+    def brightness(self):
+        """Return the current brightness."""
+        return value_to_brightness(BRIGHTNESS_SCALE, self._reference().bright)
 
-            # 상태 변경 알림
-            self.async_write_ha_state()
+    @property
+    def color_temp_kelvin(self):
+        return int((self._reference().color / 20) * 2000 + 3500)
+
+    @property
+    def supported_color_modes(self):
+        """Return the supported color modes."""
+        return {ColorMode.COLOR_TEMP}
+
+    @property
+    def color_mode(self):
+        """Return the current color mode."""
+        return ColorMode.COLOR_TEMP
+
+    @property
+    def max_color_temp_kelvin(self):
+        return 5500
+
+    @property
+    def min_color_temp_kelvin(self):
+        return 3500
+
+    @property
+    def device_info(self):
+        """Return a device for the zone, placed in the zone's area."""
+        return {
+            "identifiers": {(DOMAIN, f"zone_{self._zone_id}")},
+            "name": self._name,
+            "manufacturer": "Inshow",
+            "model": "Inshow Zone",
+            "sw_version": "1.0",
+            "suggested_area": self._api.request_zone(self._zone_id)["name"],
+        }
+
+    async def async_turn_on(self, **kwargs):
+        """Turn every light of the zone on."""
+        reference = self._reference()
+        bright = reference.bright
+        color = reference.color
+        if "brightness" in kwargs:
+            bright = int((kwargs["brightness"] / 255) * 100)
+        if "color_temp_kelvin" in kwargs:
+            color = int(((kwargs["color_temp_kelvin"] - 3500) / 2000) * 20)
+        self._send_zone_command(1, bright, color)
+
+    async def async_turn_off(self, **kwargs):
+        """Turn every light of the zone off."""
+        reference = self._reference()
+        self._send_zone_command(0, reference.bright, reference.color)
+
+    async def async_set_light(self, onoff, brightness=None, color_temp_kelvin=None):
+        """Handle the inshow.set_lights service for the whole zone."""
+        kwargs = {}
+        if brightness is not None:
+            kwargs["brightness"] = brightness
+        if color_temp_kelvin is not None:
+            kwargs["color_temp_kelvin"] = color_temp_kelvin
+        if onoff:
+            await self.async_turn_on(**kwargs)
         else:
+            await self.async_turn_off()
+
+    def _send_zone_command(self, onoff, bright, color):
+        # 상태 반영은 api의 zone dispatch를 통해 멤버 레코드와 이 엔티티에 전달됨
+        self._api.async_schedule_zone_command(
+            self._zone_id,
+            onoff,
+            int(bright // 10) * 10,
+            int(color // 2) * 2,
+        )
+
+    def _zone_state(self):
+        reference = self._reference()
+        return (reference.onoff == 1, reference.bright, reference.color)
+
+    async def async_added_to_hass(self):
+        self._written_state = self._zone_state()
+        self._unsub_dispatcher = async_dispatcher_connect(
+            self.hass,
+            SIGNAL_ZONE_UPDATE.format(self._zone_id),
+            self._handle_zone_update,
+        )
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_DEVICE_REMOVED.format(f"zone_{self._zone_id}"),
+                self._async_handle_removed,
+            )
+        )
+
+    async def _async_handle_removed(self):
+        """Remove the entity when its zone has no lights left."""
+        if self.registry_entry is not None:
+            er.async_get(self.hass).async_remove(self.entity_id)
+        else:
+            await self.async_remove(force_remove=True)
+
+    @callback
+    def _handle_zone_update(self):
+        """Write the state after a member light or the whole zone changed."""
+        if (state := self._zone_state()) == self._written_state:
+            self._api.stats["state_writes_suppressed"] += 1
             return
+        self._written_state = state
+        self._api.stats["state_writes"] += 1
+        self.async_write_ha_state()
 
     async def async_will_remove_from_hass(self):
-        # Dispatcher unsubscribe
         if self._unsub_dispatcher is not None:
             self._unsub_dispatcher()
@@ -0,0 +1,159 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+import time
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory, UnitOfTime
+
+from . import DOMAIN
+from .const import MODE_POLLING, MODE_PUSH
+
+# 계측 값은 hot path에서 세기만 하고 sensor는 주기적으로 읽어감
+SCAN_INTERVAL = timedelta(seconds=30)
+
+
+@dataclass(frozen=True, kw_only=True)
+class InshowMetricDescription(SensorEntityDescription):
+    """Describe a sensor reading one of the api performance counters."""
+
+    value_fn: Callable
+
+
+METRIC_SENSORS = (
+    InshowMetricDescription(
+        key="messages",
+        name="Inshow messages received",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda api: sum(api.message_counts.values()),
+    ),
+    InshowMetricDescription(
+        key="parse_failures",
+        name="Inshow parse failures",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda api: api.stats["parse_failures"],
+    ),
+    InshowMetricDescription(
+        key="publishes",
+        name="Inshow publishes",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda api: api.stats["publishes"],
+    ),
+    InshowMetricDescription(
+        key="reconnects",
+        name="Inshow reconnects",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda api: api.stats["reconnects"],
+    ),
+    InshowMetricDescription(
+        key="state_writes",
+        name="Inshow state writes",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda api: api.stats["state_writes"],
+    ),
+    InshowMetricDescription(
+        key="dispatch_latency",
+        name="Inshow dispatch latency",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        value_fn=lambda api: api.stats["last_dispatch_ms"],
+    ),
+)
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up Inshow diagnostic sensors from config entry."""
+    api = config_entry.runtime_data
+    sensors = [InshowMetricSensor(api, description) for description in METRIC_SENSORS]
+    sensors.append(InshowMessageRateSensor(api))
+    sensors.append(InshowModeSensor(api))
+    async_add_entities(sensors)
+
+
+class InshowMetricSensor(SensorEntity):
+    """Diagnostic sensor for one performance counter, disabled by default."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, api, description):
+        self._api = api
+        self.entity_description = description
+        self._attr_unique_id = f"{api.entry_id}_{description.key}"
+
+    @property
+    def native_value(self):
+        return self.entity_description.value_fn(self._api)
+
+    @property
+    def device_info(self):
+        """Return the device of the whole account."""
+        return {
+            "identifiers": {(DOMAIN, self._api.entry_id)},
+            "name": "Inshow",
+            "manufacturer": "Inshow",
+        }
+
+
+class InshowMessageRateSensor(InshowMetricSensor):
+    """Inbound messages per second since the previous poll."""
+
+    def __init__(self, api):
+        super().__init__(
+            api,
+            SensorEntityDescription(
+                key="message_rate",
+                name="Inshow message rate",
+                native_unit_of_measurement="msg/s",
+                state_class=SensorStateClass.MEASUREMENT,
+                suggested_display_precision=1,
+            ),
+        )
+        self._last_count = None
+        self._last_time = None
+        self._attr_native_value = None
+
+    @property
+    def native_value(self):
+        return self._attr_native_value
+
+    async def async_update(self):
+        count = sum(self._api.message_counts.values())
+        now = time.monotonic()
+        if self._last_count is not None and now > self._last_time:
+            self._attr_native_value = (count - self._last_count) / (now - self._last_time)
+        self._last_count = count
+        self._last_time = now
+
+
+class InshowModeSensor(InshowMetricSensor):
+    """Whether state arrives over MQTT push or fallback /zones polling."""
+
+    # 상태 수신 방식은 문제 파악에 바로 필요하므로 기본으로 켜 둠
+    _attr_entity_registry_enabled_default = True
+
+    def __init__(self, api):
+        super().__init__(
+            api,
+            InshowMetricDescription(
+                key="mode",
+                name="Inshow connection mode",
+                device_class=SensorDeviceClass.ENUM,
+                options=[MODE_PUSH, MODE_POLLING],
+                value_fn=lambda api: api.mode,
+            ),
+        )
+
+    @property
+    def extra_state_attributes(self):
+        connection = self._api.connection
+        return {
+            "connected": connection is not None and connection.connected,
+            "degraded_polls": self._api.stats["degraded_polls"],
+        }
@@ -0,0 +1,126 @@
+"""Record raw MQTT traffic for replay and load testing.
+
+A recording is a 4 byte header followed by length-prefixed records:
+timestamp (double), direction (u8), topic length (u16), payload length (u32),
+then the topic and payload bytes. The file is only ever appended to.
+benchmarks/replay_traffic.py plays a recording back against a local broker.
+"""
+
+from collections import deque
+from datetime import timedelta
+import logging
+import os
+import struct
+import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_time_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"ISR1"
+RECORD_HEADER = struct.Struct("<dBHI")
+DIRECTION_IN = 0
+DIRECTION_OUT = 1
+
+# 메모리에 남겨둘 최근 레코드 수 (diagnostics에 포함) / 파일 크기 상한 (넘으면 파일 기록만 멈춤)
+RING_BUFFER_SIZE = 1000
+MAX_FILE_SIZE = 50 * 1024 * 1024
+FLUSH_INTERVAL = timedelta(seconds=5)
+
+
+def _as_bytes(data):
+    return data if isinstance(data, bytes) else str(data).encode()
+
+
+def encode_record(timestamp, direction, topic, payload):
+    topic = topic.encode()
+    payload = _as_bytes(payload)
+    return (
+        RECORD_HEADER.pack(timestamp, direction, len(topic), len(payload))
+        + topic
+        + payload
+    )
+
+
+def read_recording(path):
+    """Yield (timestamp, direction, topic, payload) from a recording file."""
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an Inshow traffic recording")
+        while header := file.read(RECORD_HEADER.size):
+            if len(header) < RECORD_HEADER.size:
+                # 기록 중 종료되어 잘린 마지막 레코드는 버림
+                return
+            timestamp, direction, topic_len, payload_len = RECORD_HEADER.unpack(header)
+            topic = file.read(topic_len)
+            payload = file.read(payload_len)
+            if len(payload) < payload_len:
+                return
+            yield timestamp, direction, topic.decode(), payload
+
+
+class InshowTrafficRecorder:
+    """Keep recent raw messages in a ring buffer and append them to a file."""
+
+    def __init__(self, hass, path):
+        self.hass = hass
+        self.path = path
+        self.recent = deque(maxlen=RING_BUFFER_SIZE)
+        # MQTT 스레드가 쌓고 executor가 파일로 옮김 (deque는 thread-safe)
+        self._pending = deque()
+        self._unsub_flush = None
+        self._file_full = False
+        self.records = 0
+
+    def record(self, direction, topic, payload):
+        """Record one message; called from the MQTT thread or the event loop."""
+        entry = (time.time(), direction, topic, payload)
+        self.recent.append(entry)
+        self._pending.append(entry)
+        self.records += 1
+
+    def recent_as_list(self):
+        """Return the ring buffer as (timestamp, direction, topic, payload) rows."""
+        return [
+            [timestamp, direction, topic, _as_bytes(payload).decode(errors="replace")]
+            # MQTT 스레드가 계속 추가하므로 먼저 복사한 뒤 순회
+            for timestamp, direction, topic, payload in list(self.recent)
+        ]
+
+    @callback
+    def async_start(self):
+        self._unsub_flush = async_track_time_interval(
+            self.hass, self._async_flush, FLUSH_INTERVAL
+        )
+
+    async def async_stop(self):
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        await self._async_flush()
+
+    async def _async_flush(self, _now=None):
+        if self._pending:
+            await self.hass.async_add_executor_job(self._write_pending)
+
+    def _write_pending(self):
+        pending = self._pending
+        chunks = []
+        while pending:
+            chunks.append(encode_record(*pending.popleft()))
+        if self._file_full:
+            return
+        new_file = not os.path.exists(self.path)
+        with open(self.path, "ab") as file:
+            if new_file:
+                file.write(MAGIC)
+            file.write(b"".join(chunks))
+            if file.tell() >= MAX_FILE_SIZE:
+                self._file_full = True
+                _LOGGER.warning(
+                    "Traffic recording %s reached %d bytes, keeping only the "
+                    "in-memory buffer from now on",
+                    self.path,
+                    MAX_FILE_SIZE,
+                )
@@ -0,0 +1,60 @@
+"""Fixtures for Inshow tests."""
+
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.inshow.api import (
+    InshowApi,
+    InshowClimateState,
+    InshowLightState,
+    InshowStateStore,
+)
+from custom_components.inshow.const import (
+    CONF_CONFIRM_TIMEOUT,
+    CONF_RECONCILE_INTERVAL,
+)
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Load custom_components/inshow in every test."""
+    yield
+
+
+def light(name, controller_id, port, zone_id="zone1", onoff=0, bright=50, color=10):
+    return InshowLightState(
+        name, f"dev_{name}", controller_id, port, zone_id, onoff, bright, color
+    )
+
+
+def climate(name, controller_id, zone_id="zone1", current_temp=21.0):
+    return InshowClimateState(
+        name, f"dev_{name}", controller_id, zone_id, current_temp, 22.0, True, "1"
+    )
+
+
+def make_store(*records):
+    store = InshowStateStore()
+    for record in records:
+        store.add(record)
+    return store
+
+
+def make_zones(store, zone_id="zone1"):
+    return {zone_id: {"name": "geosil", "members": list(store.lights)}}
+
+
+@pytest.fixture
+async def api(hass):
+    """Return an InshowApi without network access or background timers."""
+    with patch("custom_components.inshow.api.async_get_clientsession"):
+        api = InshowApi(
+            hass,
+            "user@example.com",
+            "secret",
+            {CONF_RECONCILE_INTERVAL: 0, CONF_CONFIRM_TIMEOUT: 0},
+            "entry1",
+        )
+    yield api
+    await api.async_shutdown()
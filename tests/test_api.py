@@ -0,0 +1,271 @@
+"""Tests for the Inshow API state handling."""
+
+import asyncio
+import base64
+import json
+import time
+from unittest.mock import patch
+
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from custom_components.inshow.api import (
+    ENTITY_BATCH_SIZE,
+    ROUTE_LIGHT,
+    TOKEN_LIFETIME,
+    _token_expiry,
+)
+from custom_components.inshow.const import (
+    SIGNAL_DEVICE_REMOVED,
+    SIGNAL_LIGHT_UPDATE,
+    SIGNAL_NEW_DEVICES,
+    SIGNAL_ZONE_UPDATE,
+)
+
+from .conftest import climate, light, make_store, make_zones
+
+
+def _jwt(payload):
+    body = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    return f"e30.{body.rstrip('=')}.sig"
+
+
+def test_token_expiry_reads_exp():
+    assert _token_expiry(_jwt({"exp": 1700000000})) == 1700000000
+
+
+def test_token_expiry_falls_back_to_lifetime():
+    for token in ("not-a-jwt", _jwt({"sub": "user"}), "a.!!!.c"):
+        expiry = _token_expiry(token)
+        assert abs(expiry - (time.time() + TOKEN_LIFETIME)) < 5
+
+
+async def test_request_batches_keep_controllers_whole(api):
+    records = [
+        light(f"big_{port}", "MCS_BIG", port) for port in range(ENTITY_BATCH_SIZE + 4)
+    ]
+    records += [light(f"a_{port}", "MCS_A", port) for port in range(3)]
+    records += [light(f"b_{port}", "MCS_B", port) for port in range(3)]
+    api.store = make_store(*records)
+
+    batches = api.request_batches(list(api.store.lights))
+
+    # 한 controller가 상한보다 커도 나누지 않고, 작은 controller들은 합침
+    assert [len(batch) for batch in batches] == [ENTITY_BATCH_SIZE + 4, 6]
+    for controller_id in ("MCS_BIG", "MCS_A", "MCS_B"):
+        holding = [
+            batch
+            for batch in batches
+            if any(api.store.get(name).controller_id == controller_id for name in batch)
+        ]
+        assert len(holding) == 1
+
+
+async def test_apply_topology_keeps_records_and_reports_changes(hass, api):
+    old = make_store(
+        light("kept", "MCS1", 1),
+        light("drifted", "MCS1", 2),
+        light("removed", "MCS2", 1),
+        climate("75DFISCA_room", "75DFISCA1"),
+    )
+    assert api._async_apply_topology(old, make_zones(old)) == 0
+    api.entities_loaded = True
+    kept = api.store.get("kept")
+    drifted = api.store.get("drifted")
+
+    new_devices = []
+    removed = []
+    async_dispatcher_connect(
+        hass,
+        SIGNAL_NEW_DEVICES.format("entry1"),
+        lambda names, zone_ids: new_devices.append(names),
+    )
+    async_dispatcher_connect(
+        hass, SIGNAL_DEVICE_REMOVED.format("removed"), lambda: removed.append(True)
+    )
+
+    new = make_store(
+        light("kept", "MCS1", 1),
+        light("drifted", "MCS1", 2, onoff=1),
+        light("added", "MCS3", 1),
+        climate("75DFISCA_room", "75DFISCA1"),
+    )
+    drift = api._async_apply_topology(new, make_zones(new))
+    await hass.async_block_till_done()
+
+    assert drift == 1
+    # 엔티티가 잡고 있는 레코드는 그대로 두고 상태만 갱신
+    assert api.store.get("kept") is kept
+    assert api.store.get("drifted") is drifted
+    assert drifted.onoff == 1
+    assert api.store.light_index[("MCS1", 2)] is drifted
+    assert new_devices == [["added"]]
+    assert removed == [True]
+    assert api.store.get("removed") is None
+
+
+async def test_apply_topology_replaces_moved_device(api):
+    old = make_store(light("lamp", "MCS1", 1))
+    api._async_apply_topology(old, make_zones(old))
+    record = api.store.get("lamp")
+
+    # 같은 이름이라도 다른 port로 옮겨가면 새 장치로 취급
+    new = make_store(light("lamp", "MCS1", 2))
+    api._async_apply_topology(new, make_zones(new))
+
+    assert api.store.get("lamp") is not record
+    assert api.store.get("lamp").port == 2
+
+
+async def test_light_commands_group_same_state_ports(api):
+    published = []
+    api.mqtt_msg = lambda topic, msg, qos=0: published.append((topic, json.loads(msg)))
+    api.store = make_store(*(light(f"l{port}", "MCS1", port) for port in (1, 2, 3)))
+
+    api.async_schedule_light_command("MCS1", 2, 1, 80, 10)
+    api.async_schedule_light_command("MCS1", 1, 1, 80, 10)
+    api.async_schedule_light_command("MCS1", 3, 0, 50, 10)
+    # 같은 port의 나중 명령이 앞선 명령을 대체
+    api.async_schedule_light_command("MCS1", 3, 0, 60, 10)
+    api._light_timers.pop("MCS1").cancel()
+    api._async_flush_light_commands("MCS1")
+
+    assert len(published) == 2
+    by_ports = {tuple(payload["data"]["ports"]): payload for _, payload in published}
+    assert by_ports[(1, 2)]["data"] == {
+        "ports": [1, 2],
+        "onoff": 1,
+        "bright": 80,
+        "color": 10,
+    }
+    assert by_ports[(3,)]["data"]["bright"] == 60
+    assert {topic for topic, _ in published} == {"$MTZ/inshow/mcs/MCS1/state/control"}
+
+
+async def test_apply_topology_signals_devices_added_to_empty_account(hass, api):
+    # 장치가 없던 계정도 플랫폼 setup 이후 추가된 장치는 알려야 함
+    api._async_apply_topology(make_store(), {})
+    api.entities_loaded = True
+    new_devices = []
+    async_dispatcher_connect(
+        hass,
+        SIGNAL_NEW_DEVICES.format("entry1"),
+        lambda names, zone_ids: new_devices.append(sorted(names)),
+    )
+
+    new = make_store(light("lamp", "MCS1", 1), climate("75DFISCA_room", "75DFISCA1"))
+    api._async_apply_topology(new, make_zones(new))
+    await hass.async_block_till_done()
+
+    assert new_devices == [["75DFISCA_room", "lamp"]]
+
+
+async def test_shutdown_cancels_reconnect_resync(hass, api):
+    started = asyncio.Event()
+
+    async def _hang(conditional=True):
+        started.set()
+        await asyncio.Event().wait()
+
+    with patch.object(api, "get_data", _hang):
+        api._async_on_reconnect(time.monotonic())
+        # 진행 중인 재동기화가 있으면 새로 만들지 않음
+        resync = api._resync_task
+        api._async_on_reconnect(time.monotonic())
+        assert api._resync_task is resync
+        await started.wait()
+        await api.async_shutdown()
+        await hass.async_block_till_done()
+
+    assert resync.cancelled()
+    assert api._resync_task is None
+
+
+def _zones_payload(onoff):
+    device = {
+        "_id": "dev1",
+        "name": "1번",
+        "isVirtual": False,
+        "controllerId": "MCS1",
+        "item": {"ports": [1], "onoff": onoff, "bright": 50, "color": 10},
+    }
+    return {
+        "resultData": [
+            {"_id": "zone1", "name": "geosil", "groups": [{"name": "a", "devices": [device]}]}
+        ]
+    }
+
+
+async def test_get_data_saves_cache_only_when_topology_changes(api):
+    response = type("Response", (), {"status": 200, "headers": {}})()
+    api.names._names = {"geosil": "geosil", "a": "a"}
+    with (
+        patch.object(api, "_async_request", return_value=(response, _zones_payload(0))),
+        patch.object(api._topology_store, "async_save") as save,
+    ):
+        assert await api.get_data()
+        assert await api.get_data()
+        assert save.call_count == 1
+
+        api._async_request.return_value = (response, _zones_payload(1))
+        assert await api.get_data()
+
+    assert save.call_count == 2
+    assert api.stats["topology_saves"] == 2
+
+
+async def test_get_data_skips_cache_save_while_stopping(api):
+    api._stopping = True
+    response = type("Response", (), {"status": 200, "headers": {}})()
+    with (
+        patch.object(api, "_async_request", return_value=(response, {"resultData": []})),
+        patch.object(api._topology_store, "async_save") as save,
+    ):
+        assert await api.get_data()
+
+    save.assert_not_called()
+
+
+async def test_login_after_shutdown_does_not_rearm_refresh(api):
+    await api.async_shutdown()
+
+    assert not await api.async_login()
+    assert api._unsub_token_refresh is None
+
+
+async def test_inbox_burst_is_drained_once(hass, api):
+    api.store = make_store(light("a1", "MCS1", 1), light("a2", "MCS1", 2))
+    api.zones = make_zones(api.store)
+    signals = []
+    for signal in (
+        SIGNAL_LIGHT_UPDATE.format("MCS1", 1),
+        SIGNAL_LIGHT_UPDATE.format("MCS1", 2),
+        SIGNAL_ZONE_UPDATE.format("zone1"),
+    ):
+        async_dispatcher_connect(hass, signal, lambda s=signal: signals.append(s))
+
+    def _burst():
+        for onoff in (1, 0, 1):
+            for port in (1, 2):
+                api._enqueue_message(
+                    (ROUTE_LIGHT, "MCS1"),
+                    {"serial": "MCS1", "data": {"port": port, "onoff": onoff}},
+                )
+
+    # MQTT 스레드에서 들어온 메시지 묶음은 event loop에서 한 번에 처리
+    await hass.async_add_executor_job(_burst)
+    await hass.async_block_till_done()
+
+    assert api.stats["drains"] == 1
+    assert api.stats["drained_messages"] == 6
+    assert api.inbox_depth == 0
+    # 엔티티마다 signal 한 번, 값은 마지막 메시지
+    assert sorted(signals) == sorted(
+        [
+            SIGNAL_LIGHT_UPDATE.format("MCS1", 1),
+            SIGNAL_LIGHT_UPDATE.format("MCS1", 2),
+            SIGNAL_ZONE_UPDATE.format("zone1"),
+        ]
+    )
+    assert api.store.get("a1").onoff == 1
+    assert api.store.get("a2").onoff == 1
+    assert api.last_message["MCS1"] > 0
@@ -0,0 +1,54 @@
+"""Tests for the Inshow thermostat state writes."""
+
+from unittest.mock import MagicMock, patch
+
+from custom_components.inshow.climate import InshowClimate
+
+from .conftest import climate, make_store
+
+
+def _thermostat(api):
+    api.store = make_store(climate("75DFISCA_room", "75DFISCA1", current_temp=21.0))
+    api.temp_hysteresis = 0.5
+    api.temp_min_interval = 60
+    entity = InshowClimate(api, "75DFISCA_room")
+    entity.async_write_ha_state = MagicMock()
+    with patch("custom_components.inshow.climate.time.monotonic", return_value=1000):
+        entity._async_write_state()
+    entity.async_write_ha_state.reset_mock()
+    return entity
+
+
+def _update(entity, now, **data):
+    entity._record.apply(data)
+    with patch("custom_components.inshow.climate.time.monotonic", return_value=now):
+        entity._handle_climate_update()
+    return entity.async_write_ha_state.called
+
+
+async def test_small_temperature_change_is_suppressed(api):
+    entity = _thermostat(api)
+
+    assert not _update(entity, 2000, Temperature=21.3, POWER_RL="ON")
+    assert api.stats["state_writes_suppressed"] == 1
+
+
+async def test_temperature_change_is_rate_limited(api):
+    entity = _thermostat(api)
+
+    # 변화량은 넘었지만 마지막 기록 후 temp_min_interval이 지나지 않음
+    assert not _update(entity, 1030, Temperature=22.0, POWER_RL="ON")
+    assert _update(entity, 1061, Temperature=22.0, POWER_RL="ON")
+
+
+async def test_other_fields_are_written_immediately(api):
+    entity = _thermostat(api)
+
+    assert _update(entity, 1001, TempTargetSet=25.0)
+
+
+async def test_availability_change_is_written(api):
+    entity = _thermostat(api)
+    api.unconfirmed.add("75DFISCA_room")
+
+    assert _update(entity, 1001)
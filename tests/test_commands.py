@@ -0,0 +1,138 @@
+"""Tests for command coalescing, the in-flight backlog and confirmations."""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from custom_components.inshow.api import (
+    CLIMATE_CONFIRM_TIMEOUT,
+    ROUTE_CLIMATE,
+    ROUTE_LIGHT,
+)
+
+from .conftest import climate, light, make_store
+
+
+def _capture(api):
+    """Record published payloads and hand out increasing mids."""
+    published = []
+
+    def mqtt_msg(topic, msg, qos=0):
+        published.append(json.loads(msg))
+        return SimpleNamespace(rc=0, mid=len(published))
+
+    api.mqtt_msg = mqtt_msg
+    return published
+
+
+def _send_lights(api, controller_id, ports, onoff):
+    for port in ports:
+        api.async_schedule_light_command(controller_id, port, onoff, 50, 10)
+    api._light_timers.pop(controller_id).cancel()
+    api._async_flush_light_commands(controller_id)
+
+
+async def test_backlog_keeps_order_across_disconnect(api):
+    published = _capture(api)
+    api.store = make_store(
+        light("a1", "MCS1", 1), light("a2", "MCS1", 2), light("b1", "MCS2", 1)
+    )
+    api.max_inflight = 1
+
+    _send_lights(api, "MCS2", [1], 1)
+    _send_lights(api, "MCS1", [1, 2], 1)
+    assert len(published) == 1
+
+    # 끊기면 in-flight가 비지만 대기 중인 명령보다 새 명령이 먼저 나가면 안 됨
+    api._async_reset_inflight()
+    _send_lights(api, "MCS1", [1], 0)
+    api._async_on_publish(2)
+    api._async_drain_backlog()
+
+    mcs1 = [payload["data"] for payload in published if payload["serial"] == "MCS1"]
+    assert [(data["ports"], data["onoff"]) for data in mcs1] == [([2], 1), ([1], 0)]
+
+
+async def test_backlog_replaces_same_key(api):
+    published = _capture(api)
+    api.store = make_store(light("a1", "MCS1", 1), light("b1", "MCS2", 1))
+    api.max_inflight = 1
+
+    _send_lights(api, "MCS2", [1], 1)
+    key = ("75DFISCA1", "TempTargetSet")
+    for value in (20, 21):
+        api.async_schedule_command(key, "t", json.dumps({"v": value}))
+        api._command_timers.pop(key).cancel()
+        api._async_flush_command(key)
+    # window가 찬 동안 같은 key의 명령은 최신 값 하나만 대기
+    assert list(api._command_backlog) == [key]
+
+    api._async_on_publish(1)
+
+    assert published[-1] == {"v": 21}
+    assert not api._command_backlog
+
+
+def _receive(api, kind, target, data):
+    api._inbox.append((kind, target, data))
+    api._async_drain_inbox()
+
+
+async def test_confirmation_matches_reported_state(api):
+    _capture(api)
+    api.store = make_store(light("a1", "MCS1", 1))
+    api.confirm_timeout = 5
+
+    _send_lights(api, "MCS1", [1], 1)
+    timer = api._awaiting[("MCS1", 1)][3]
+
+    # 다른 값의 보고는 확인이 아님
+    _receive(api, ROUTE_LIGHT, "MCS1", {"serial": "MCS1", "data": {"port": 1, "onoff": 0}})
+    assert ("MCS1", 1) in api._awaiting
+
+    _receive(
+        api,
+        ROUTE_LIGHT,
+        "MCS1",
+        {"serial": "MCS1", "data": {"port": 1, "onoff": 1, "bright": 50, "color": 10}},
+    )
+    assert not api._awaiting
+    assert timer.cancelled()
+    assert api.stats["confirmed"] == 1
+    assert sum(api.latency_histograms["MCS1"]) == 1
+
+
+async def test_confirmation_timeout_marks_unconfirmed_and_refetches(hass, api):
+    _capture(api)
+    api.store = make_store(light("a1", "MCS1", 1))
+    api.confirm_timeout = 5
+    api.get_data = AsyncMock(return_value=True)
+
+    _send_lights(api, "MCS1", [1], 1)
+    # timer가 만료된 것처럼 직접 호출
+    api._awaiting[("MCS1", 1)][3].cancel()
+    api._async_confirmation_timeout(("MCS1", 1))
+
+    assert api.unconfirmed == {"a1"}
+    assert api.stats["confirm_timeouts"] == 1
+    assert api.command_timeouts == {"MCS1": 1}
+    await hass.async_block_till_done()
+    api.get_data.assert_awaited_once_with(conditional=False)
+
+    # 늦게 온 보고도 장치를 다시 available로 돌림
+    _receive(api, ROUTE_LIGHT, "MCS1", {"serial": "MCS1", "data": {"port": 1, "onoff": 1}})
+    assert not api.unconfirmed
+
+
+async def test_thermostat_confirmation_waits_for_report_interval(hass, api):
+    _capture(api)
+    api.store = make_store(climate("75DFISCA_room", "75DFISCA1"))
+    api.confirm_timeout = 5
+    key = ("75DFISCA1", "POWER_RL")
+
+    api._async_publish_command("t", "{}", [(key, {"POWER_RL": "ON"})])
+    # 온도조절기는 ROOMTEMPREAL 주기가 길어 더 오래 기다림
+    assert api._awaiting[key][3].when() - hass.loop.time() > CLIMATE_CONFIRM_TIMEOUT - 1
+
+    _receive(api, ROUTE_CLIMATE, "75DFISCA1", {"Temperature": 21, "POWER_RL": "ON"})
+    assert not api._awaiting
@@ -0,0 +1,104 @@
+"""Tests for the shared broker connection."""
+
+from unittest.mock import MagicMock
+
+import paho.mqtt.client as mqtt
+
+from custom_components.inshow.api import (
+    MAX_TOPICS_PER_SUBSCRIBE,
+    InshowConnection,
+    async_get_connection,
+)
+from custom_components.inshow.const import TRANSPORT_EVENT_LOOP, TRANSPORT_THREAD
+
+
+def _connection(hass):
+    connection = InshowConnection(hass, TRANSPORT_THREAD)
+    connection.client = MagicMock()
+    connection.client.subscribe.return_value = (mqtt.MQTT_ERR_SUCCESS, 1)
+    return connection
+
+
+def _subscribed(client):
+    return [topic for call in client.subscribe.call_args_list for topic, _ in call.args[0]]
+
+
+def _unsubscribed(client):
+    return [topic for call in client.unsubscribe.call_args_list for topic in call.args[0]]
+
+
+async def test_entries_share_one_connection_per_transport(hass):
+    thread = async_get_connection(hass, TRANSPORT_THREAD)
+
+    assert async_get_connection(hass, TRANSPORT_THREAD) is thread
+    assert async_get_connection(hass, TRANSPORT_EVENT_LOOP) is not thread
+
+
+async def test_shared_topic_subscribed_once(hass):
+    connection = _connection(hass)
+
+    connection.subscribe(["a", "shared"])
+    connection.subscribe(["shared", "b"])
+
+    assert _subscribed(connection.client) == ["a", "shared", "b"]
+
+
+async def test_shared_topic_unsubscribed_after_last_entry(hass):
+    connection = _connection(hass)
+    connection.subscribe(["a", "shared"])
+    connection.subscribe(["shared", "b"])
+
+    connection.unsubscribe(["a", "shared"])
+    assert _unsubscribed(connection.client) == ["a"]
+
+    connection.unsubscribe(["shared", "b"])
+    assert _unsubscribed(connection.client) == ["a", "shared", "b"]
+    # 이미 놓은 topic을 다시 놓아도 UNSUBSCRIBE를 보내지 않음
+    connection.unsubscribe(["a"])
+    assert _unsubscribed(connection.client) == ["a", "shared", "b"]
+
+
+async def test_subscribe_splits_large_topic_lists(hass):
+    connection = _connection(hass)
+
+    connection.subscribe([f"t{i}" for i in range(MAX_TOPICS_PER_SUBSCRIBE + 1)])
+
+    sizes = [len(call.args[0]) for call in connection.client.subscribe.call_args_list]
+    assert sizes == [MAX_TOPICS_PER_SUBSCRIBE, 1]
+
+
+async def test_reconnect_without_session_resubscribes_every_topic(hass):
+    connection = _connection(hass)
+    connection.subscribe(["a", "b"])
+    connection.client.subscribe.reset_mock()
+
+    connection._async_on_connect({"session present": 0}, 0)
+
+    assert sorted(_subscribed(connection.client)) == ["a", "b"]
+
+
+async def test_reconnect_with_session_sends_only_failed_subscribes(hass):
+    connection = _connection(hass)
+    connection.subscribe(["a"])
+    # 끊긴 동안 보내지 못한 SUBSCRIBE
+    connection.client.subscribe.return_value = (mqtt.MQTT_ERR_NO_CONN, None)
+    connection.subscribe(["b"])
+    connection.client.subscribe.reset_mock()
+    connection.client.subscribe.return_value = (mqtt.MQTT_ERR_SUCCESS, 2)
+
+    connection._async_on_connect({"session present": 1}, 0)
+
+    assert _subscribed(connection.client) == ["b"]
+    assert not connection._unsent
+
+
+async def test_reconnect_notifies_entries_once(hass):
+    connection = _connection(hass)
+    api = MagicMock()
+    connection._apis = [api]
+    connection._disconnected_at = 100.0
+
+    connection._async_on_connect({"session present": 1}, 0)
+    connection._async_on_connect({"session present": 1}, 0)
+
+    api._async_on_reconnect.assert_called_once_with(100.0)
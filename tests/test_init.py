@@ -0,0 +1,119 @@
+"""Tests for setting up, reloading and unloading Inshow entries."""
+
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.inshow.api import InshowApi
+from custom_components.inshow.const import (
+    CONF_CONFIRM_TIMEOUT,
+    CONF_KEEP_CONNECTION,
+    CONF_RECONCILE_INTERVAL,
+    CONF_TEMP_HYSTERESIS,
+    CONF_TRANSPORT,
+    DOMAIN,
+    TRANSPORT_EVENT_LOOP,
+)
+
+from .conftest import light, make_store, make_zones
+
+OPTIONS = {CONF_RECONCILE_INTERVAL: 0, CONF_CONFIRM_TIMEOUT: 0}
+
+
+@pytest.fixture
+def started():
+    """Start entries with a fixed topology instead of signing in and connecting."""
+    apis = []
+
+    async def _start(api):
+        apis.append(api)
+        store = make_store(light("a1", "MCS1", 1))
+        api._async_apply_topology(store, make_zones(store))
+        return True
+
+    with (
+        patch("custom_components.inshow.api.async_get_clientsession"),
+        patch.object(InshowApi, "async_load_cached_topology", return_value=False),
+        patch.object(InshowApi, "async_start", autospec=True, side_effect=_start),
+    ):
+        yield apis
+
+
+async def _setup(hass):
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"E-mail": "user@example.com", "password": "secret"},
+        options=OPTIONS,
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def test_options_reload_reuses_warm_api(hass, started):
+    entry = await _setup(hass)
+    api = entry.runtime_data
+
+    hass.config_entries.async_update_entry(
+        entry, options={**OPTIONS, CONF_TEMP_HYSTERESIS: 1.5}
+    )
+    await hass.async_block_till_done()
+
+    # 다시 로그인/연결하지 않고 같은 api에 옵션만 반영
+    assert entry.runtime_data is api
+    assert len(started) == 1
+    assert not api._stopping
+    assert api.temp_hysteresis == 1.5
+    assert not hass.data[DOMAIN]["warm"]
+    assert hass.states.get("light.a1") is not None
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    assert api._stopping
+
+
+async def test_transport_change_starts_new_api(hass, started):
+    entry = await _setup(hass)
+    api = entry.runtime_data
+
+    hass.config_entries.async_update_entry(
+        entry, options={**OPTIONS, CONF_TRANSPORT: TRANSPORT_EVENT_LOOP}
+    )
+    await hass.async_block_till_done()
+
+    assert entry.runtime_data is not api
+    assert len(started) == 2
+    assert api._stopping
+    assert entry.runtime_data.transport == TRANSPORT_EVENT_LOOP
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_keep_connection_disabled_shuts_down_on_reload(hass, started):
+    entry = await _setup(hass)
+    api = entry.runtime_data
+
+    hass.config_entries.async_update_entry(
+        entry, options={**OPTIONS, CONF_KEEP_CONNECTION: False}
+    )
+    await hass.async_block_till_done()
+
+    assert entry.runtime_data is not api
+    assert api._stopping
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_refresh_adds_entities_for_new_devices(hass, started):
+    entry = await _setup(hass)
+    api = entry.runtime_data
+
+    store = make_store(light("a1", "MCS1", 1), light("a2", "MCS1", 2))
+    api._async_apply_topology(store, make_zones(store))
+    await hass.async_block_till_done()
+
+    assert hass.states.get("light.a2") is not None
+    assert not hass.states.async_entity_ids("climate")
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
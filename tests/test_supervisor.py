@@ -0,0 +1,69 @@
+"""Tests for switching between MQTT push and /zones polling."""
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+from custom_components.inshow.api import STALE_TIMEOUT
+from custom_components.inshow.const import MODE_POLLING, MODE_PUSH
+
+from .conftest import climate, light, make_store
+
+
+def _connect(api, connected=True):
+    api.connection = MagicMock(connected=connected, async_remove_api=AsyncMock())
+    api.get_data = AsyncMock(return_value=True)
+
+
+async def test_disconnected_broker_switches_to_polling_and_back(hass, api):
+    api.store = make_store(climate("75DFISCA_room", "75DFISCA1"))
+    _connect(api, connected=False)
+
+    api._async_supervise()
+    await hass.async_block_till_done()
+    assert api.mode == MODE_POLLING
+    api.get_data.assert_awaited_once()
+    assert api.stats["degraded_polls"] == 1
+
+    api.connection.connected = True
+    api.last_message["75DFISCA1"] = time.monotonic()
+    api._async_supervise()
+    await hass.async_block_till_done()
+    assert api.mode == MODE_PUSH
+    assert api.stats["mode_changes"] == 2
+    api.get_data.assert_awaited_once()
+
+
+async def test_quiet_thermostats_switch_to_polling(hass, api):
+    api.store = make_store(climate("75DFISCA_room", "75DFISCA1"))
+    _connect(api)
+    api.last_message["75DFISCA1"] = time.monotonic() - STALE_TIMEOUT - 1
+
+    api._async_supervise()
+    await hass.async_block_till_done()
+
+    assert api.mode == MODE_POLLING
+
+
+async def test_quiet_lights_stay_in_push_mode(hass, api):
+    # 조명은 바뀔 때만 보고하므로 조용해도 끊긴 것으로 보지 않음
+    api.store = make_store(light("a1", "MCS1", 1))
+    _connect(api)
+    api.last_message["MCS1"] = time.monotonic() - STALE_TIMEOUT - 1
+
+    api._async_supervise()
+    await hass.async_block_till_done()
+
+    assert api.mode == MODE_PUSH
+    api.get_data.assert_not_awaited()
+
+
+async def test_polling_waits_for_poll_interval(hass, api):
+    _connect(api, connected=False)
+    api.poll_interval = 60
+
+    api._async_supervise()
+    await hass.async_block_till_done()
+    api._async_supervise()
+    await hass.async_block_till_done()
+
+    api.get_data.assert_awaited_once()
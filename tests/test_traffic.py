@@ -0,0 +1,124 @@
+"""Tests for the traffic recording format and replay."""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks import replay_traffic
+from custom_components.inshow.traffic import (
+    DIRECTION_IN,
+    DIRECTION_OUT,
+    MAGIC,
+    encode_record,
+    read_recording,
+)
+
+
+def test_recording_round_trip(tmp_path):
+    records = [
+        (1700000000.25, DIRECTION_IN, "$MTZ/inshow/mcs/MCS1/state/changed", b'{"a": 1}'),
+        (1700000001.5, DIRECTION_OUT, "stat/inshow/75DFISCA1/AWAYMODESET", '{"b": 2}'),
+    ]
+    path = tmp_path / "traffic.bin"
+    path.write_bytes(MAGIC + b"".join(encode_record(*record) for record in records))
+
+    assert list(read_recording(path)) == [
+        records[0],
+        (*records[1][:3], b'{"b": 2}'),
+    ]
+
+
+def test_recording_ignores_truncated_tail(tmp_path):
+    record = encode_record(1.0, DIRECTION_IN, "topic", b"payload")
+    path = tmp_path / "traffic.bin"
+    path.write_bytes(MAGIC + record + record[:-3])
+
+    assert list(read_recording(path)) == [(1.0, DIRECTION_IN, "topic", b"payload")]
+
+
+def test_recording_rejects_other_files(tmp_path):
+    path = tmp_path / "traffic.bin"
+    path.write_bytes(b"nope")
+
+    with pytest.raises(ValueError):
+        list(read_recording(path))
+
+
+def _fake_clock():
+    """Return a replay clock that only advances when replay sleeps."""
+    clock = SimpleNamespace(now=0.0, sleeps=[])
+
+    async def sleep(delay):
+        clock.sleeps.append(delay)
+        clock.now += delay
+
+    return clock, patch.multiple(
+        replay_traffic,
+        asyncio=SimpleNamespace(sleep=sleep),
+        time=SimpleNamespace(monotonic=lambda: clock.now),
+    )
+
+
+async def test_replay_keeps_recorded_pacing():
+    records = [
+        (100.0, DIRECTION_IN, "a", b"1"),
+        (101.0, DIRECTION_IN, "b", b"2"),
+        (103.0, DIRECTION_IN, "c", b"3"),
+    ]
+    clock, patcher = _fake_clock()
+    delivered = []
+
+    with patcher:
+        count = await replay_traffic.async_replay(
+            records, lambda topic, payload: delivered.append((clock.now, topic)), 10
+        )
+
+    assert count == 3
+    # 10배속: 원래 1초, 2초 간격이 0.1초, 0.2초로
+    assert delivered == [
+        (0.0, "a"),
+        (pytest.approx(0.1), "b"),
+        (pytest.approx(0.3), "c"),
+    ]
+
+
+async def test_replay_filters_direction():
+    records = [
+        (100.0, DIRECTION_OUT, "out1", b"1"),
+        (105.0, DIRECTION_IN, "in1", b"2"),
+        (106.0, DIRECTION_OUT, "out2", b"3"),
+        (107.0, DIRECTION_IN, "in2", b"4"),
+    ]
+    clock, patcher = _fake_clock()
+
+    with patcher:
+        inbound = []
+        assert await replay_traffic.async_replay(
+            records, lambda topic, payload: inbound.append(topic), 1
+        ) == 2
+        # 첫 inbound 메시지가 기준이라 앞선 outbound 간격은 기다리지 않음
+        assert clock.sleeps == [pytest.approx(2.0)]
+
+        outbound = []
+        await replay_traffic.async_replay(
+            records,
+            lambda topic, payload: outbound.append(topic),
+            0,
+            direction=DIRECTION_OUT,
+        )
+
+    assert inbound == ["in1", "in2"]
+    assert outbound == ["out1", "out2"]
+
+
+async def test_replay_at_full_speed_only_yields():
+    count = replay_traffic.REPLAY_YIELD_EVERY + 1
+    records = [(100.0 + i, DIRECTION_IN, "t", b"") for i in range(count)]
+    clock, patcher = _fake_clock()
+
+    with patcher:
+        delivered = await replay_traffic.async_replay(records, lambda *args: None, 0)
+
+    assert delivered == count
+    assert clock.sleeps == [0, 0]